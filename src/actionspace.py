@@ -0,0 +1,97 @@
+"""
+A fixed numbering of every move that can ever be legal on a board of a given
+size, so moves can be handled as integers and the legal moves of a position
+as a bitmask, see Game.legalMask and Game.playIndex. The numbering only
+depends on the board dimensions:
+
+    0                   the skip action
+    1 ...               the swaps, one per pair of neighbouring squares
+    ...                 the actions, by acting square: one per other square
+                        as a single target, then every set of two or more
+                        neighbours, the targets in ascending order
+"""
+
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, Tuple
+
+from move import Move, MOVE_SWAP, MOVE_ACTION, SKIP, swapMove
+from geometry import boardGeometry
+from exceptions import InputError
+
+
+class ActionSpace:
+    """
+    The numbered moves of one board size.
+
+    Attributes:
+        moves: moves[k] is the move with index k.
+        indices: Maps each move, targets in ascending order, to its index.
+        swap_count: The number of swaps, which have indices 1 to swap_count.
+    """
+
+    def __init__(self, width: int, height: int):
+        geometry = boardGeometry(width, height)
+        size = geometry.size
+
+        swaps = [swapMove(i, j) for i in range(size) for j in geometry.neighbours[i] if i < j]
+        actions = []
+
+        for src in range(size):
+            # archers, wizards and everyone adjacent hit a single square
+            actions += [(MOVE_ACTION, src, t) for t in range(size) if t != src]
+
+            # knights and medics can hit several neighbours at once
+            neighbours = sorted(geometry.neighbours[src])
+            for k in range(2, len(neighbours) + 1):
+                actions += [(MOVE_ACTION, src, *c) for c in combinations(neighbours, k)]
+
+        self.moves: Tuple[Move, ...] = (SKIP, *swaps, *actions)
+        self.indices: Dict[Move, int] = {move: k for k, move in enumerate(self.moves)}
+        self.swap_count: int = len(swaps)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def index(self, move: Move) -> int:
+        """
+        Returns the index of a move.
+
+        Args:
+            move: The move, action targets may be in any order.
+
+        Returns:
+            The index of the move.
+
+        Raises:
+            InputError: If the move can never be legal on this board.
+        """
+        if move[0] == MOVE_ACTION and len(move) > 3:
+            move = (MOVE_ACTION, move[1], *sorted(move[2:]))
+        elif move[0] == MOVE_SWAP:
+            move = swapMove(move[1], move[2])
+
+        try:
+            return self.indices[move]
+        except KeyError:
+            raise InputError(f'{move} is not a move on this board')
+
+    def move(self, index: int) -> Move:
+        """
+        Returns the move with an index.
+
+        Raises:
+            InputError: If there is no move with that index.
+        """
+        if not 0 <= index < len(self.moves):
+            raise InputError(f'There is no move {index}, the moves are numbered 0 to {len(self.moves) - 1}')
+
+        return self.moves[index]
+
+
+@lru_cache(maxsize=None)
+def actionSpace(width: int, height: int) -> ActionSpace:
+    """
+    Returns the shared action space for a width by height board.
+    """
+    return ActionSpace(width, height)
@@ -1,113 +1,648 @@
 from game import Game, State
 from bot import Bot
 from colour import Colour
-import copy
+from cell import HP_MASK, HP_SHIFT, ACTIVE_BIT, KIND_MASK, MAX_TRGTS, MEDIC, WIZARD, TEAM
+from move import MOVE_ACTION
+from transposition import TranspositionTable, SharedTranspositionTable, EXACT, LOWER, UPPER
+from symmetry import IDENTITY, FLIP, canonicalHash, transformMove
+from ordering import HeuristicOrdering, captureValue
+from contextlib import redirect_stdout
+from time import perf_counter
+import multiprocessing
+import weakref
 
 
-class Node:
+class _OutOfBudget(Exception):
+    """
+    Raised inside the search once the budget of chooseMove is spent.
+    """
 
-    def __init__(self, state, parent, data=None):
-        self.state = state
-        self.parent = parent
-        self.children = []
-        self.data = copy.deepcopy(data)
-        self.value = 0
 
-    def __str__(self):
-        return f'{self.state}\n{self.visits=}, {self.wins=}, {self.data=}'
+def _release(pool):
+    """
+    Stops the helper processes of a parallel search.
+    """
+    pool.terminate()
+    pool.join()
 
-    def expand(self):
-        if self.state.state == State.SWAP:
-            swaps = list(self.state.listSwaps())
+def _moveKey(move):
+    """
+    Returns move, or each move of a turn, with its targets in ascending
+    order, so moves from the shared transposition table compare equal to
+    the generated ones.
+    """
+    if isinstance(move[0], tuple):
+        return tuple(_moveKey(m) for m in move)
+    if move[0] == MOVE_ACTION and len(move) > 3:
+        return (MOVE_ACTION, move[1], *sorted(move[2:]))
+    return move
 
-            for swap in swaps:
-                g = copy.deepcopy(self.state)
-                g.swap(swap[0]._pos, swap[1]._pos)
-                self.children.append(Node(g, self, swap))
-        else:
-            actions = self.state.listActions()
 
-            for action in actions:
-                g = copy.deepcopy(self.state)
-                if action:
-                    p = list(action.keys())[0]
-                    g.action(p._pos, [x._pos for x in action[p]])
-                else:
-                    g.skipAction()
-                self.children.append(Node(g, self, action))
+class AlphaBetaBot(Bot):
 
+    # the deepest iteration of a search with a budget
+    MAX_DEPTH = 64
+    # how many nodes are visited between looks at the clock
+    CLOCK_INTERVAL = 256
+    # the value of winning at the root, a win n plies away is worth WIN - n
+    WIN = 1_000_000.
+    # values at least this far from 0 are certain wins or losses
+    WIN_BOUND = WIN - MAX_DEPTH
+    # how far either side of the previous iteration's value the root window
+    # starts in principal variation search
+    ASPIRATION = 4.
+    # late move reductions apply from this depth to the quiet moves after the
+    # first LMR_MOVES of a node
+    LMR_DEPTH = 3
+    LMR_MOVES = 3
+    # the most a quiet action gains on stateHeuristic, a medic healing the
+    # most neighbours it can, all of them active
+    FUTILITY_MARGIN = 2. * MAX_TRGTS[MEDIC]
 
-class AlphaBetaBot(Bot):
+    def __init__(self, game_manager, team, macro=False, cache_size=0, tt_size=1 << 16, symmetry=False,
+                 time_limit=None, node_limit=None, ordering=None, pvs=True, lmr=False, futility=False,
+                 maximal=False, workers=1):
+        super().__init__(game_manager, team, macro, cache_size, maximal)
+        # the number of processes searching at once, see searchParallel,
+        # experimental: it has not been shown to reach deeper in the same time
+        self.workers = workers
+        # the helpers of a parallel search, started by the first one
+        self.pool = None
+        # free the pool and the shared table if the bot is dropped unclosed
+        self._finalizers = []
+        # whether this bot is a helper of a parallel search
+        self.helper = False
+        # kept from one search to the next, values are from the side to play
+        # at the root, which is the bot's
+        if workers > 1:
+            if not tt_size:
+                raise ValueError('A parallel search needs a transposition table to share')
+            game = game_manager.game
+            self.table = SharedTranspositionTable(game.WIDTH, game.HEIGHT, tt_size)
+            self._finalizers.append(weakref.finalize(self, self.table.close))
+        else:
+            self.table = TranspositionTable(tt_size) if tt_size else None
+        # whether positions share entries with their mirror images, see symmetry.py
+        self.symmetry = symmetry
+        # the budget of a search in seconds and in nodes, None for no limit,
+        # with neither the search goes to the depth given by searchDepth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.depth = 0
+        # the order moves are searched in, see ordering.py
+        self.ordering = ordering if ordering is not None else HeuristicOrdering()
+        # whether to use principal variation search, late move reductions and
+        # futility pruning, see alphaBeta
+        self.pvs = pvs
+        self.lmr = lmr
+        self.futility = futility
 
     def chooseMove(self, time=None):
-        # set the depth dynamically based on the number of alive pieces
-        depth = 12 - self.numberOfAlivePieces()//2
-        root = Node(self.manager.game, None)
+        """
+        Searches the position, see search, in parallel if the bot has more
+        than one worker.
+
+        Args:
+            time: The seconds to search for, time_limit if None.
+
+        Returns:
+            The best move, or turn in macro mode, of the deepest completed
+            iteration.
+        """
+        if time is None:
+            time = self.time_limit
+
+        if time is None and self.node_limit is None:
+            max_depth = self.searchDepth()
+        else:
+            max_depth = self.MAX_DEPTH
+
+        # the search plays and undoes moves on a private copy of the game
+        game = self.searchGame()
+
+        if self.workers > 1:
+            self.searchParallel(game, time, max_depth)
+            print(f'Visited {self.worker_nodes} nodes per worker to depth {self.depth}')
+        else:
+            self.search(game, time, max_depth)
+            print(f'Visited {self.visited} nodes to depth {self.depth}')
+        print(self.principal_variation)
+
+        return self.root_scores[0][0]
+
+    def search(self, game, time, max_depth, first_depth=1):
+        """
+        Searches the position one ply deeper at a time until the budget runs
+        out, trying the best moves of each iteration first in the next. An
+        iteration cut short is thrown away. The results are left in
+        root_scores, principal_variation, depth and visited.
+
+        Args:
+            game: The game to search on, changed during the search.
+            time: The seconds to search for, None for no limit.
+            max_depth: The depth of the last iteration.
+            first_depth: The depth of the first iteration.
+
+        Returns:
+            None
+        """
+        self.deadline = perf_counter() + time if time is not None else None
+        self.game = game
+        # how often each position occurred before the root, to tell cycles
+        # within the search from repeats of the game so far
+        self.earlier = dict(game.position_counts)
+        self.earlier[game.hash] -= 1
         self.visited = 0
+        self.depth = 0
+        self.root_order = None
+        # the moves of the root by value, and the line both players are
+        # expected to play, of the deepest completed iteration
+        self.root_scores = []
+        self.principal_variation = []
 
-        self.alphaBeta(root, depth, float('-inf'), float('inf'), self.manager.game.turn)
+        # a parallel search ages the table before its helpers start
+        if self.table is not None and self.workers == 1 and not self.helper:
+            self.table.newSearch()
+        self.ordering.newSearch()
 
-        choice = max(root.children, key=lambda n : n.value)
-        print(f'Visited {self.visited} nodes')
-        print(choice.data)
+        for depth in range(first_depth, max_depth + 1):
+            guess = self.root_scores[0][1] if self.root_scores else None
+            try:
+                scores, pv = self.searchRoot(depth, guess)
+            except _OutOfBudget:
+                break
 
-        return choice.data
+            # sorting is stable so ties keep the order they were searched in
+            self.root_scores = sorted(scores, key=lambda s : s[1], reverse=True)
+            self.principal_variation = pv
+            self.depth = depth
+            self.root_order = [move for move, _ in self.root_scores]
 
-    def numberOfAlivePieces(self):
-        count = 0
+            # deeper iterations cannot change a certain outcome
+            if abs(self.root_scores[0][1]) >= self.WIN_BOUND:
+                break
+
+    def searchParallel(self, game, time, max_depth):
+        """
+        Searches the position in workers processes at once, Lazy SMP style:
+        this process and workers - 1 helpers from a pool each run search on
+        the same position, sharing the transposition table, every other
+        helper starting one ply deeper. What one finds cuts the search of the
+        others, and they drift apart enough to explore different moves
+        first. Once this process is done the helpers are told to stop. The
+        deepest completed search gives the result, this process's on ties.
+        The nodes of each process are left in worker_nodes, this one first.
+        The helper processes are started by the first parallel search and
+        kept until close.
+
+        This is experimental: on the boards of the game the processes have
+        not been measured to reach deeper in the same time than a single
+        one, see speedup.py.
+
+        Args:
+            game: The game to search on, changed during the search.
+            time: The seconds to search for, None for no limit.
+            max_depth: The depth of the last iteration.
+
+        Returns:
+            None
+        """
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers - 1)
+            self._finalizers.append(weakref.finalize(self, _release, self.pool))
+
+        # before the helpers start, so they find the table aged and the stop
+        # flag cleared
+        self.table.newSearch()
+
+        settings = dict(macro=self.macro, symmetry=self.symmetry, ordering=self.ordering, pvs=self.pvs,
+                        lmr=self.lmr, futility=self.futility, maximal=self.maximal,
+                        node_limit=self.node_limit)
+        task = (game.toBytes(), game.position_counts, game.max_repetitions, settings,
+                self.table.name, self.table.size, time, max_depth)
+        helpers = self.pool.map_async(_helperSearch, [task + (1 + k % 2,) for k in range(1, self.workers)])
 
-        for p in self.manager.game.pieces:
-            if self.manager.game.pieces[p]._hp > 0:
-                count += 1
+        self.search(game, time, max_depth)
+        self.table.stop()
 
-        return count
+        results = [(self.depth, self.root_scores, self.principal_variation, self.visited)] + helpers.get()
+        self.worker_nodes = [visited for *_, visited in results]
+        self.depth, self.root_scores, self.principal_variation, _ = max(results, key=lambda r : r[0])
+        self.visited = sum(self.worker_nodes)
 
-    def stateHeuristic(self, node, maximizing_player):
-        if node.state.won == Colour.BOTH:
+    def close(self):
+        """
+        Stops the helper processes of parallel search and frees the shared
+        transposition table. Done when the bot is dropped if not before.
+        """
+        if self._finalizers:
+            for finalizer in self._finalizers:
+                finalizer()
+            self._finalizers = []
+            self.pool = None
+            self.table = None
+
+    def searchRoot(self, depth, guess):
+        """
+        Searches the position to depth. In principal variation search the
+        window starts ASPIRATION either side of guess and is opened up on
+        the side the value falls outside of.
+
+        Args:
+            depth: The depth to search to.
+            guess: The value of the previous iteration, None for the first.
+
+        Returns:
+            The moves of the root with their values, in the order they were
+            searched, and the principal variation.
+        """
+        a, b = float('-inf'), float('inf')
+        if self.pvs and guess is not None:
+            a, b = guess - self.ASPIRATION, guess + self.ASPIRATION
+
+        while True:
+            self.scores = []
+            # pv[ply] is the best line found from the node being searched at ply
+            self.pv = [[] for _ in range(depth + 2)]
+            value = self.alphaBeta(depth, 0, a, b, self.game.turn)
+
+            if value <= a:
+                a = float('-inf')
+            elif value >= b:
+                b = float('inf')
+            else:
+                return self.scores, self.extendLine(self.pv[0], depth)
+
+    def extendLine(self, line, depth):
+        """
+        Returns line followed by the best moves the transposition table has
+        for the positions after it, up to depth moves. Lines are cut short
+        wherever the search took a value from the table.
+        """
+        if self.table is None:
+            return line
+
+        game = self.game
+        line = list(line)
+        for move in line:
+            self.play(game, move)
+
+        while len(line) < depth and game.won is None:
+            key, transform = self.tableKey(game)
+            entry = self.table.probe(key)
+            if entry is None or entry.move is None:
+                break
+
+            move = self.mapMove(game, entry.move, transform)
+            if not self.isLegal(game, move):
+                break
+            self.play(game, move)
+            line.append(move)
+
+        for move in reversed(line):
+            self.unplay(game, move)
+
+        return line
+
+    def searchDepth(self):
+        """
+        Returns the depth to search to without a budget, deeper as the board
+        empties.
+        """
+        size = self.manager.game.WIDTH * self.manager.game.HEIGHT
+        depth = max(1, 12 - 8*self.numberOfAlivePieces()//size)
+        if self.macro:
+            # a ply is a whole turn, so search as many turns
+            depth = (depth + 1) // 2
+        return depth
+
+    def checkBudget(self):
+        """
+        Raises _OutOfBudget once the search has used up its time or nodes.
+        The first iteration always completes, so there is a move to return,
+        unless the search is a helper that was told to stop. The clock and
+        the stop flag are read every CLOCK_INTERVAL nodes, or every node in
+        macro mode, where each node plays out all its turns to generate them.
+        """
+        interval = 1 if self.macro else self.CLOCK_INTERVAL
+        if self.helper and self.visited % interval == 0 and self.table.stopped():
+            raise _OutOfBudget
+        if not self.depth:
+            return
+
+        if self.node_limit is not None and self.visited > self.node_limit:
+            raise _OutOfBudget
+        if self.deadline is not None and self.visited % interval == 0 \
+                and perf_counter() >= self.deadline:
+            raise _OutOfBudget
+
+    def watchClock(self, turns):
+        """
+        Yields turns, raising _OutOfBudget between them once the time is up
+        after the first iteration, since generating the turns of a node can
+        take longer than the whole budget.
+        """
+        for turn in turns:
+            if self.depth and self.deadline is not None and perf_counter() >= self.deadline:
+                raise _OutOfBudget
+            yield turn
+
+    def numberOfAlivePieces(self):
+        game = self.manager.game
+        return game.aliveCount(Colour.BLACK) + game.aliveCount(Colour.WHITE)
+
+    def stateHeuristic(self, game, maximizing_player, ply=0):
+        if game.won == Colour.BOTH:
             value = 0.
-        elif node.state.won == Colour.BLACK:
-            value = float('inf')
-        elif node.state.won == Colour.WHITE:
-            value = float('-inf')
+        elif game.won == Colour.BLACK:
+            # the sooner the better
+            value = self.WIN - ply
+        elif game.won == Colour.WHITE:
+            value = ply - self.WIN
         else:
             # want alive and active pieces
-            scores = {Colour.BLACK: 0., Colour.WHITE: 0.}
-            for p in node.state.pieces:
-                piece = node.state.pieces[p]
-                if piece._hp <= 0:
-                    continue
-                scores[piece._colour] += 2 * piece._hp if piece._active else piece._hp
+            scores = [0., 0., 0.]
+            for c in game.cells:
+                hp = (c & HP_MASK) >> HP_SHIFT
+                scores[TEAM[c]] += 2 * hp if c & ACTIVE_BIT else hp
 
-            value =  scores[Colour.BLACK] - scores[Colour.WHITE]
+            value =  scores[1] - scores[2]
 
         return value if maximizing_player == Colour.BLACK else -value
 
-    def alphaBeta(self, node, depth, a, b, maximizing_player):
+    def tableKey(self, game):
+        """
+        Returns the key of the position in the transposition table and the
+        transform from the position to the one stored, see symmetry.py.
+        """
+        if self.symmetry:
+            return canonicalHash(game)
+        return game.hash, IDENTITY
+
+    def toTable(self, value, ply):
+        """
+        Returns value as stored in the transposition table, where wins and
+        losses count their plies from the position instead of the root.
+        """
+        if value >= self.WIN_BOUND:
+            return value + ply
+        elif value <= -self.WIN_BOUND:
+            return value - ply
+        return value
+
+    def fromTable(self, value, ply):
+        """
+        Inverse of toTable.
+        """
+        if value >= self.WIN_BOUND:
+            return value - ply
+        elif value <= -self.WIN_BOUND:
+            return value + ply
+        return value
+
+    def mapMove(self, game, move, transform):
+        """
+        Maps a move or turn between the position and the one stored in the
+        transposition table.
+        """
+        if move is None or transform == IDENTITY:
+            return move
+        if self.macro:
+            return tuple(transformMove(game, m, transform) for m in move)
+        return transformMove(game, move, transform)
+
+    def isLegal(self, game, move):
+        if not self.macro:
+            return game.isLegal(move)
+
+        legal = True
+        played = 0
+        for m in move:
+            if not game.isLegal(m):
+                legal = False
+                break
+            game.playMove(m)
+            played += 1
+
+        for _ in range(played):
+            game.undo()
+
+        return legal
+
+    def orderMoves(self, game, first, ply):
+        """
+        Yields the moves of the position, first before the rest if it is
+        legal, then the rest in the order of self.ordering.
+        """
+        if first is not None and self.isLegal(game, first):
+            yield first
+            first = _moveKey(first)
+        else:
+            first = None
+
+        # the rest are only generated if first does not cause a cutoff
+        # moves leading to the same position are only searched once
+        if self.macro:
+            moves = self.watchClock(game.iterTurns(skip_last=True, maximal=self.maximal))
+        else:
+            moves = game.iterMoves(skip_last=True, unique=True, maximal=self.maximal)
+
+        if first is not None:
+            moves = [m for m in moves if _moveKey(m) != first]
+        yield from self.ordering.order(game, list(moves), ply)
+
+    def alphaBeta(self, depth, ply, a, b, maximizing_player):
+        """
+        Searches the position to depth, fail-soft: a value at or below a is
+        an upper bound and one at or above b a lower bound. The search is
+        depth first and keeps nothing of the positions below but their value
+        and best line, so memory grows with the depth only. The values of
+        the moves of the root are collected in self.scores.
+
+        In principal variation search the first move is searched with the
+        whole window and the others with a null window, which only tells
+        whether they beat the best so far. Values are multiples of 1, so the
+        null window is one wide. The moves that do are searched again with
+        the rest of the window.
+
+        Below the root, quiet moves, which deal no damage and leave the number
+        of active pieces of both teams as it was, are searched selectively.
+        Late move reductions search the quiet moves late in the order one
+        ply shallower, and again at full depth if they beat the best so far.
+        Futility pruning skips the quiet actions of the last ply when the
+        board is too far behind the window for one to catch up. It leaves
+        out teleports, which can change which pieces are active, and swaps,
+        which the same side's action follows.
+        """
         self.visited += 1
         if self.visited % 1000 == 0:
             print(self.visited)
+        self.checkBudget()
 
-        if depth <= 0 or node.state.won is not None:
-            node.value = self.stateHeuristic(node, maximizing_player)
-            return node.value
+        game = self.game
+        self.pv[ply] = []
+
+        if depth <= 0 or game.won is not None:
+            return self.stateHeuristic(game, maximizing_player, ply)
+
+        # a position that already occurred in the search is a cycle, which
+        # either side can repeat until the repetition rule draws the game
+        if (ply and game.max_repetitions is not None
+                and game.repetitions() - self.earlier.get(game.hash, 0) > 1):
+            return 0.
+
+        table = self.table
+        window = (a, b)
+        tt_move = None
+
+        if table is not None:
+            key, transform = self.tableKey(game)
+            entry = table.probe(key)
+
+            if entry is not None:
+                value, bound = self.fromTable(entry.value, ply), entry.bound
+                # the stored position has the colours swapped
+                if transform & FLIP:
+                    value, bound = -value, (EXACT, UPPER, LOWER)[bound]
+                tt_move = self.mapMove(game, entry.move, transform)
+
+                # the root needs the values of its children
+                if ply and entry.depth >= depth:
+                    if bound == EXACT:
+                        return value
+                    elif bound == LOWER:
+                        a = max(a, value)
+                    else:
+                        b = min(b, value)
+
+                    if a >= b:
+                        return value
+
+        maximizing = maximizing_player == game.turn
+        value = float('-inf') if maximizing else float('inf')
+        best = None
+
+        reduce = self.lmr and ply and depth >= self.LMR_DEPTH
+        futile = False
+        if self.futility and ply and depth == 1 and game.state == State.ACTION:
+            static = self.stateHeuristic(game, maximizing_player, ply)
+            # the most, or least, a quiet action can be worth here
+            margin = self.FUTILITY_MARGIN
+            hope = static + margin if maximizing else static - margin
+            futile = hope <= a if maximizing else hope >= b
+        selective = reduce or futile
+        counts = list(game.active_counts)
+
+        if not ply and self.root_order:
+            # the order the previous iteration ranked the moves in
+            moves = self.root_order
+        else:
+            moves = self.orderMoves(game, tt_move, ply)
 
-        node.expand()
+        for k, move in enumerate(moves):
+            quiet = selective and best is not None and not captureValue(game, move)
+            prunable = futile and quiet and not (
+                    move[0] == MOVE_ACTION and game.cells[move[1]] & KIND_MASK == WIZARD)
+            self.play(game, move)
+            quiet = quiet and game.active_counts == counts
 
-        if maximizing_player == node.state.turn:
-            value = float('-inf')
-            for child in node.children:
-                node.value = max(value, self.alphaBeta(child, depth-1, a, b, maximizing_player))
-                value = node.value
+            # a move that ends the game, by the repetition rule, is not quiet
+            if prunable and quiet and game.won is None:
+                self.unplay(game, move)
+                # the skipped move is worth at most hope
+                value = max(value, hope) if maximizing else min(value, hope)
+                continue
+
+            if best is None:
+                score = self.alphaBeta(depth-1, ply+1, a, b, maximizing_player)
+            else:
+                if not self.pvs:
+                    lo, hi = a, b
+                elif maximizing:
+                    lo, hi = a, a+1
+                else:
+                    lo, hi = b-1, b
+
+                if quiet and reduce and k >= self.LMR_MOVES:
+                    score = self.alphaBeta(depth-2, ply+1, lo, hi, maximizing_player)
+                    # a reduced move that looks better gets the full depth
+                    if score > a if maximizing else score < b:
+                        score = self.alphaBeta(depth-1, ply+1, lo, hi, maximizing_player)
+                else:
+                    score = self.alphaBeta(depth-1, ply+1, lo, hi, maximizing_player)
+
+                if self.pvs and a < score < b:
+                    if maximizing:
+                        score = self.alphaBeta(depth-1, ply+1, score, b, maximizing_player)
+                    else:
+                        score = self.alphaBeta(depth-1, ply+1, a, score, maximizing_player)
+
+            self.unplay(game, move)
+
+            if not ply:
+                self.scores.append((move, score))
+
+            if best is None or (score > value if maximizing else score < value):
+                value, best = score, move
+                self.pv[ply] = [move] + self.pv[ply+1]
+
+            if maximizing:
                 if value >= b:
+                    self.ordering.cutoff(game, move, ply, depth)
                     break
                 a = max(a, value)
-        else:
-            value = float('inf')
-            for child in node.children:
-                node.value = min(value, self.alphaBeta(child, depth-1, a, b, maximizing_player))
-                value = node.value
+            else:
                 if value <= a:
+                    self.ordering.cutoff(game, move, ply, depth)
                     break
                 b = min(b, value)
 
+        if best is None:
+            # nothing to play, the rules give no outcome so judge the board
+            value = self.stateHeuristic(game, maximizing_player, ply)
+
+        if table is not None:
+            if value <= window[0]:
+                bound = UPPER
+            elif value >= window[1]:
+                bound = LOWER
+            else:
+                bound = EXACT
+
+            stored = self.toTable(value, ply)
+            if transform & FLIP:
+                stored, bound = -stored, (EXACT, UPPER, LOWER)[bound]
+            table.store(key, depth, stored, bound, self.mapMove(game, best, transform))
+
         return value
+
+
+# the shared transposition tables this process has attached to, by name
+_attached = {}
+
+def _helperSearch(task):
+    """
+    Runs one helper of AlphaBetaBot.searchParallel in a pool process.
+
+    Returns:
+        The depth, root_scores, principal_variation and visited of the
+        helper's search.
+    """
+    data, counts, max_repetitions, settings, name, size, time, max_depth, first_depth = task
+
+    game = Game.fromBytes(data)
+    game.max_repetitions = max_repetitions
+    game.position_counts = counts
+
+    if name not in _attached:
+        _attached[name] = SharedTranspositionTable(game.WIDTH, game.HEIGHT, size, name)
+
+    bot = AlphaBetaBot(None, game.turn, tt_size=0, **settings)
+    bot.table = _attached[name]
+    bot.helper = True
+
+    # the search reports its progress, which is only wanted from the main one
+    with redirect_stdout(None):
+        bot.search(game, time, max_depth, first_depth)
+
+    return bot.depth, bot.root_scores, bot.principal_variation, bot.visited
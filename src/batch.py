@@ -0,0 +1,506 @@
+"""
+A vectorised engine that advances many games of the same board size at once.
+The positions are stored as NumPy arrays with one row per game, and every
+step (legal moves, playing a move, activity and winners) works on all rows
+together. It follows the rules of Game exactly, moves are numbered as in
+actionspace.py. Positions are only hashed and counted for the repetition
+rule if it is in use.
+
+NumPy is only needed by this module.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cell import (KING, MEDIC, SHIELD, WIZARD, ARCHER, KNIGHT, KIND_MASK,
+        HP_MASK, HP_SHIFT, ACTIVE_BIT, MAX_HP, SWAPABLE, MAX_TRGTS, TEAM)
+from colour import Colour
+from game import Game
+from move import MOVE_SWAP, MOVE_ACTION, MOVE_SKIP
+from actionspace import ActionSpace, actionSpace
+from geometry import boardGeometry
+from zobrist import MAX_PASSES, zobristKeys
+
+# the value of BatchGame.won while a game is in play, else it is Colour.value
+NO_WINNER = -1
+
+_TEAM = np.array(TEAM, dtype=np.int8)
+_MAX_HP = np.array(MAX_HP, dtype=np.uint8)
+_SWAPABLE = np.array(SWAPABLE, dtype=bool)
+_MAX_TRGTS = np.array(MAX_TRGTS, dtype=np.uint8)
+
+
+class BatchTables:
+    """
+    The action space and board geometry of one board size flattened into
+    index arrays. Squares are padded with the extra square size, which is
+    always empty.
+
+    Attributes:
+        kind, src, targets, count: The kind, source square, targets (swaps
+                    put the second square first) and number of targets of
+                    every move in the action space.
+        swaps, actions, singles, multis: The indices of the swaps, actions,
+                    single target and multiple target actions.
+        single_pairs: source*size + target of every single target action.
+        adjacent: adjacent[i, j] if j is next to i.
+        lines: lines[i, j] if i and j share a row or column.
+        between: between[k, i*size + j] is 1 if k lies strictly between i
+                    and j along a row or column.
+        neighbours: The (padded) neighbours of every square.
+        cell_keys, turn_key, action_key, pass_keys: The Zobrist keys of the
+                    board size as arrays, see zobrist.py.
+    """
+
+    def __init__(self, width: int, height: int):
+        space = actionSpace(width, height)
+        geometry = boardGeometry(width, height)
+        size = width*height
+        moves = space.moves
+
+        self.kind = np.array([m[0] for m in moves], dtype=np.int8)
+        self.src = np.array([m[1] if len(m) > 1 else size for m in moves], dtype=np.intp)
+        self.targets = np.full((len(moves), 4), size, dtype=np.intp)
+        for k, m in enumerate(moves):
+            if len(m) > 2:
+                self.targets[k, :len(m) - 2] = m[2:]
+        self.count = np.array([max(len(m) - 2, 0) for m in moves], dtype=np.uint8)
+
+        self.swaps = np.flatnonzero(self.kind == MOVE_SWAP)
+        self.actions = np.flatnonzero(self.kind == MOVE_ACTION)
+
+        # single target actions are looked up in (source, target) tables
+        singles = self.actions[self.count[self.actions] == 1]
+        self.singles = singles
+        self.single_pairs = self.src[singles]*size + self.targets[singles, 0]
+
+        adjacent = np.zeros((size, size), dtype=bool)
+        for i, neighbours in enumerate(geometry.neighbours):
+            adjacent[i, list(neighbours)] = True
+        self.adjacent = adjacent
+
+        # between[k, i*size + j] is set if k lies strictly between i and j
+        # along a row or column, lines[i, j] if there is such a line
+        lines = np.zeros((size, size), dtype=bool)
+        between = np.zeros((size, size*size), dtype=np.float32)
+        for i in range(size):
+            for j in range(size):
+                squares = geometry.between[i][j]
+                if squares is not None:
+                    lines[i, j] = True
+                    between[list(squares), i*size + j] = 1
+        self.lines = lines
+        self.between = between
+
+        multis = self.actions[self.count[self.actions] > 1]
+        self.multis = multis
+
+        neighbours = np.full((size, 4), size, dtype=np.intp)
+        for i, n in enumerate(geometry.neighbours):
+            neighbours[i, :len(n)] = n
+        self.neighbours = neighbours
+
+        keys = zobristKeys(size)
+        self.cell_keys = np.array(keys.cells, dtype=np.uint64)
+        self.turn_key = np.uint64(keys.turn)
+        self.action_key = np.uint64(keys.action)
+        self.pass_keys = np.array(keys.passes, dtype=np.uint64)
+
+
+@lru_cache(maxsize=None)
+def batchTables(width: int, height: int) -> BatchTables:
+    """
+    Returns the shared tables for a width by height board.
+    """
+    return BatchTables(width, height)
+
+
+class BatchGame:
+    """
+    N positions of a width by height board.
+
+    Attributes:
+        WIDTH: The width of the board.
+        HEIGHT: The height of the board.
+        size: The number of squares on the board.
+        max_passes: The maximum number of passes a player can do before forfeiting.
+        max_repetitions: Each game is drawn when a position occurs this many
+                    times in it, None to never draw by repetition.
+        action_space: The numbering of moves for the board's dimensions.
+        tables: The index arrays for the board's dimensions.
+        cells: An (N, size) array of packed cells, see cell.py.
+        turn: The Colour.value of the side to play in each game.
+        state: The State.value of each game.
+        passes: An (N, 2) array with the passes of black and white.
+        won: The Colour.value of the winner of each game, NO_WINNER while the
+                    game is in play.
+        position_counts: How many times each position, by hash, occurred in
+                    each game, as in Game. None without a repetition rule.
+    """
+
+    def __init__(self, n: int, width: int=4, height: int=4, layout: Optional[str]=None,
+                 max_repetitions: Optional[int]=None):
+        """
+        Creates n games in the starting position, see Game.
+        """
+        game = Game(width, height, layout, max_repetitions)
+        self._fromBytes([game.toBytes()] * n, game.max_passes, max_repetitions, [game.position_counts] * n)
+
+    @classmethod
+    def fromGames(cls, games: Sequence[Game]) -> 'BatchGame':
+        """
+        Creates a batch holding the positions of games, which must all have
+        the same dimensions. The rules and the positions that occurred so
+        far are taken from the games, the rules from the first.
+        """
+        batch = cls.__new__(cls)
+        batch._fromBytes([game.toBytes() for game in games], games[0].max_passes,
+                         games[0].max_repetitions, [game.position_counts for game in games])
+        return batch
+
+    def _fromBytes(self, positions: Sequence[bytes], max_passes: int, max_repetitions: Optional[int],
+                   position_counts: Sequence[Dict[int, int]]) -> None:
+        data = np.frombuffer(b''.join(positions), dtype=np.uint8).reshape(len(positions), -1)
+
+        if len(set(data[:, 0])) > 1:
+            raise ValueError('All games in a batch must have the same dimensions')
+
+        self.WIDTH: int = (int(data[0, 0]) >> 4) + 1
+        self.HEIGHT: int = (int(data[0, 0]) & 15) + 1
+        self.size: int = self.WIDTH*self.HEIGHT
+        self.max_passes: int = max_passes
+        self.max_repetitions: Optional[int] = max_repetitions
+        self.action_space: ActionSpace = actionSpace(self.WIDTH, self.HEIGHT)
+
+        flags = data[:, 1]
+        self.cells: np.ndarray = data[:, 4:].copy()
+        self.turn: np.ndarray = (flags & 1).astype(np.int8)
+        self.state: np.ndarray = (flags >> 1 & 1).astype(np.int8)
+        self.passes: np.ndarray = data[:, 2:4].astype(np.int16)
+        self.won: np.ndarray = (flags >> 2 & 3).astype(np.int8) - 1
+
+        self.tables: BatchTables = batchTables(self.WIDTH, self.HEIGHT)
+
+        self.position_counts: Optional[List[Dict[int, int]]] = None
+        if max_repetitions is not None:
+            self.position_counts = [dict(counts) for counts in position_counts]
+
+    def __len__(self):
+        return len(self.cells)
+
+    def toBytes(self, k: int) -> bytes:
+        """
+        Encodes game k in the format of Game.toBytes.
+        """
+        flags = int(self.turn[k]) | int(self.state[k]) << 1 | (int(self.won[k]) + 1) << 2
+        passes = np.minimum(self.passes[k], 255)
+
+        return bytes(((self.WIDTH - 1) << 4 | (self.HEIGHT - 1),
+                flags, int(passes[0]), int(passes[1]))) + self.cells[k].tobytes()
+
+    def game(self, k: int) -> Game:
+        """
+        Returns game k as a Game.
+        """
+        game = Game.fromBytes(self.toBytes(k))
+        game.max_passes = self.max_passes
+        game.max_repetitions = self.max_repetitions
+        if self.position_counts is not None:
+            game.position_counts = dict(self.position_counts[k])
+        return game
+
+    def hashes(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Computes the Zobrist hash of the given games, like Game.computeHash.
+
+        Returns:
+            The hash of each game as a uint64.
+        """
+        tables = self.tables
+        cells = self.cells[rows]
+        passes = np.minimum(self.passes[rows], MAX_PASSES - 1)
+
+        h = np.bitwise_xor.reduce(tables.cell_keys[np.arange(self.size), cells], axis=1)
+        h ^= np.where(self.turn[rows] == 1, tables.turn_key, np.uint64(0))
+        h ^= np.where(self.state[rows] == 1, tables.action_key, np.uint64(0))
+
+        return h ^ tables.pass_keys[0, passes[:, 0]] ^ tables.pass_keys[1, passes[:, 1]]
+
+    def winners(self) -> Sequence[Optional[Colour]]:
+        """
+        Returns the winner of each game as Game.won would.
+        """
+        return [None if w == NO_WINNER else Colour(int(w)) for w in self.won]
+
+    def legalMask(self) -> np.ndarray:
+        """
+        Computes the legal moves of every game, like Game.legalMask.
+
+        Returns:
+            An (N, len(action_space)) bool array, entry [g, k] True if move k
+            is legal in game g.
+        """
+        n, size = self.cells.shape
+        mask = np.zeros((n, len(self.action_space)), dtype=bool)
+        playing = self.won == NO_WINNER
+
+        cells = self.cells
+        team = _TEAM[cells]
+        kind = cells & KIND_MASK
+        mine = (self.turn + 1)[:, None]
+
+        # swaps, either square may start it
+        rows = np.flatnonzero(playing & (self.state == 0))
+        if len(rows):
+            t, k = team[rows], kind[rows]
+            starts = ((cells[rows] & ACTIVE_BIT) != 0) & (t == mine[rows])
+            takes = (cells[rows] & HP_MASK != 0) & _SWAPABLE[k]
+            i, j = self.tables.src[self.tables.swaps], self.tables.targets[self.tables.swaps, 0]
+
+            mask[np.ix_(rows, self.tables.swaps)] = (
+                    starts[:, i] & ((t[:, j] == t[:, i]) | takes[:, j])
+                    | starts[:, j] & ((t[:, i] == t[:, j]) | takes[:, i]))
+
+        # actions, every piece that can act belongs to the side to play
+        rows = np.flatnonzero(playing & (self.state == 1))
+        if len(rows):
+            mask[rows, 0] = True
+
+            c, t, k = cells[rows], team[rows], kind[rows]
+            me = mine[rows]
+            actors = ((c & ACTIVE_BIT) != 0) & (t == me)
+            enemy = (t != 0) & (t != me)
+            ally = t == me
+            hurt = ally & ((c & HP_MASK) >> HP_SHIFT < _MAX_HP[k])
+
+            # enemy shields stop arrows
+            shields = enemy & (k == SHIELD)
+            clear = (shields.astype(np.float32) @ self.tables.between).reshape(-1, size, size) == 0
+
+            archers = actors & (k == ARCHER)
+            melee = actors & ((k == KING) | (k == KNIGHT))
+            medics = actors & (k == MEDIC)
+            wizards = actors & (k == WIZARD)
+
+            single = (archers[:, :, None] & enemy[:, None, :] & self.tables.lines & clear
+                    | melee[:, :, None] & enemy[:, None, :] & self.tables.adjacent
+                    | medics[:, :, None] & hurt[:, None, :] & self.tables.adjacent
+                    | wizards[:, :, None] & ally[:, None, :])
+
+            mask[np.ix_(rows, self.tables.singles)] = single.reshape(len(rows), -1)[:, self.tables.single_pairs]
+
+            # knights hit two enemies and medics heal up to four allies, all
+            # of them neighbours, the padding square passes either test
+            multis = self.tables.multis
+            src = self.tables.src[multis]
+            targets = self.tables.targets[multis]
+            padding = np.ones((len(rows), 1), dtype=bool)
+            enemy = np.concatenate((enemy, padding), axis=1)[:, targets].all(axis=2)
+            hurt = np.concatenate((hurt, padding), axis=1)[:, targets].all(axis=2)
+            knights = actors & (k == KNIGHT)
+
+            mask[np.ix_(rows, multis)] = (
+                    knights[:, src] & enemy & (self.tables.count[multis] == 2)
+                    | medics[:, src] & hurt)
+
+        return mask
+
+    def step(self, indices: np.ndarray) -> None:
+        """
+        Plays one move in every game, like Game.playIndex but without checking
+        that the moves are legal.
+
+        Args:
+            indices: The index of the move to play in each game, negative to
+                        leave a game as it is. Finished games are never changed.
+
+        Returns:
+            None
+        """
+        indices = np.asarray(indices)
+        rows = np.flatnonzero((self.won == NO_WINNER) & (indices >= 0))
+        moves = indices[rows]
+        kinds = self.tables.kind[moves]
+        cells = np.concatenate((self.cells, np.zeros((len(self), 1), dtype=np.uint8)), axis=1)
+
+        src = self.tables.src[moves]
+        first = self.tables.targets[moves, 0]
+        src_kind = cells[rows, src] & KIND_MASK
+
+        # swaps and teleports exchange two squares
+        exchange = (kinds == MOVE_SWAP) | ((kinds == MOVE_ACTION) & (src_kind == WIZARD))
+        r, a, b = rows[exchange], src[exchange], first[exchange]
+        cells[r, a], cells[r, b] = cells[r, b], cells[r, a].copy()
+
+        heal = (kinds == MOVE_ACTION) & (src_kind == MEDIC)
+        damage = (kinds == MOVE_ACTION) & (src_kind != MEDIC) & (src_kind != WIZARD)
+
+        for slot in range(4):
+            trgt = self.tables.targets[moves, slot]
+
+            r, t = rows[heal], trgt[heal]
+            c = cells[r, t]
+            hurt = (c & HP_MASK) >> HP_SHIFT < _MAX_HP[c & KIND_MASK]
+            cells[r, t] = np.where(hurt, c + (1 << HP_SHIFT), c)
+
+            r, t = rows[damage], trgt[damage]
+            c = cells[r, t]
+            # a dead piece keeps only its kind
+            alive = (c & HP_MASK) >> HP_SHIFT > 1
+            cells[r, t] = np.where(alive, c - (1 << HP_SHIFT), c & KIND_MASK)
+
+        self.cells[rows] = cells[rows, :-1]
+        self._updateActivity(rows)
+
+        # the turn goes on to the action after a swap, else to the other side
+        swapped = rows[kinds == MOVE_SWAP]
+        self.state[swapped] = 1
+
+        acted = rows[kinds == MOVE_ACTION]
+        self.passes[acted, self.turn[acted]] = 0
+
+        skipped = rows[kinds == MOVE_SKIP]
+        self.passes[skipped, self.turn[skipped]] += 1
+
+        ended = rows[kinds != MOVE_SWAP]
+        self.state[ended] = 0
+        self.turn[ended] ^= 1
+
+        black, white = self._isolated(swapped)
+        self._setLoser(swapped, black, white)
+
+        black, white = self._isolated(acted)
+        kb, kw = self._kingDead(acted)
+        # the king only counts if neither side is isolated
+        neither = ~(black | white)
+        self._setLoser(acted, black | (neither & kb), white | (neither & kw))
+
+        passes = self.passes[skipped]
+        self._setLoser(skipped, passes[:, 0] > self.max_passes, passes[:, 1] > self.max_passes)
+
+        self._recordPositions(rows)
+
+    def _recordPositions(self, rows: np.ndarray) -> None:
+        """
+        Counts the positions the given games just reached and draws the games
+        in play whose position occurred max_repetitions times.
+        """
+        if self.position_counts is None:
+            return
+
+        drawn = []
+        for r, h in zip(rows.tolist(), self.hashes(rows).tolist()):
+            counts = self.position_counts[r]
+            count = counts.get(h, 0) + 1
+            counts[h] = count
+            if count >= self.max_repetitions:
+                drawn.append(r)
+
+        drawn = np.array(drawn, dtype=np.intp)
+        self.won[drawn[self.won[drawn] == NO_WINNER]] = Colour.BOTH.value
+
+    def _updateActivity(self, rows: np.ndarray) -> None:
+        """
+        Recomputes the activity flags of every square of the given games. A
+        living piece is active while it has a living team mate next to it.
+        """
+        cells = self.cells[rows]
+        team = np.concatenate((_TEAM[cells], np.zeros((len(rows), 1), dtype=np.int8)), axis=1)
+        mine = team[:, :-1]
+        active = (mine != 0) & (team[:, self.tables.neighbours] == mine[:, :, None]).any(axis=2)
+
+        self.cells[rows] = cells & (0xff ^ ACTIVE_BIT) | active.astype(np.uint8) << 7
+
+    def _isolated(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        cells = self.cells[rows]
+        team = _TEAM[cells]
+        active = (cells & ACTIVE_BIT) != 0
+        return ~(active & (team == 1)).any(axis=1), ~(active & (team == 2)).any(axis=1)
+
+    def _kingDead(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        cells = self.cells[rows]
+        team = _TEAM[cells]
+        king = (cells & KIND_MASK) == KING
+        return ~(king & (team == 1)).any(axis=1), ~(king & (team == 2)).any(axis=1)
+
+    def _setLoser(self, rows: np.ndarray, black: np.ndarray, white: np.ndarray) -> None:
+        """
+        Sets the winner of the games whose black or white side lost.
+        """
+        won = np.where(black & white, Colour.BOTH.value,
+                np.where(black, Colour.WHITE.value,
+                np.where(white, Colour.BLACK.value, NO_WINNER)))
+        self.won[rows] = won
+
+    def randomIndices(self, rng: Optional[np.random.Generator]=None) -> np.ndarray:
+        """
+        Picks a legal move uniformly at random in every game.
+
+        Args:
+            rng: The random generator to use, a fresh one by default.
+
+        Returns:
+            The index of a move per game, -1 for games with no legal move.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+
+        mask = self.legalMask()
+        scores = np.where(mask, rng.random(mask.shape, dtype=np.float32), -1.)
+        choice = scores.argmax(axis=1)
+
+        return np.where(mask.any(axis=1), choice, -1)
+
+    def playout(self, max_moves: int, rng: Optional[np.random.Generator]=None) -> None:
+        """
+        Plays random moves in every game until all are finished or max_moves
+        moves have been played.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+
+        for _ in range(max_moves):
+            if (self.won != NO_WINNER).all():
+                return
+            self.step(self.randomIndices(rng))
+
+    def expand(self) -> Tuple['BatchGame', np.ndarray, np.ndarray]:
+        """
+        Plays every legal move of every game.
+
+        Returns:
+            A batch with one game per legal move, the index of the game each
+            came from and the index of the move played.
+        """
+        parents, moves = np.nonzero(self.legalMask())
+        children = self.__class__.__new__(self.__class__)
+        children.__dict__.update(self.__dict__)
+
+        children.cells = self.cells[parents]
+        children.turn = self.turn[parents]
+        children.state = self.state[parents]
+        children.passes = self.passes[parents]
+        children.won = self.won[parents]
+        if self.position_counts is not None:
+            children.position_counts = [dict(self.position_counts[p]) for p in parents.tolist()]
+        children.step(moves)
+
+        return children, parents, moves
+
+
+def perft(game: Game, depth: int) -> int:
+    """
+    Counts the move sequences of depth moves from the position of game,
+    stopping early in lines where the game is won. Useful to check that
+    BatchGame and Game agree.
+    """
+    batch = BatchGame.fromGames([game])
+    leaves = 0
+
+    for _ in range(depth):
+        leaves += int((batch.won != NO_WINNER).sum())
+        batch = batch.expand()[0]
+
+    return leaves + len(batch)
@@ -1,14 +1,25 @@
-from game import Game, State
+from game import State
+from movecache import MoveCache
 from exceptions import TurnError
 import logging
+import copy
 import time
 import random
 
 class Bot:
 
-    def __init__(self, game_manager, team):
+    def __init__(self, game_manager, team, macro=False, cache_size=0, maximal=False):
         self.manager = game_manager
         self.team = team
+        # whether chooseMove picks a whole turn, see Game.iterTurns
+        self.macro = macro
+        # whether to leave out the knight and medic actions on fewer targets,
+        # a heuristic pruning, see rules.iterActions
+        self.maximal = maximal
+        # kept from one search to the next
+        self.move_cache = MoveCache(cache_size) if cache_size else None
+        # the rest of the turn chosen by the last search
+        self.planned = []
 
     def moveCallback(self, turn_str, state_str):
         if str(self.team) == turn_str:
@@ -21,37 +32,69 @@ class Bot:
         elif self.manager.won() is not None:
             raise TurnError("The game is over")
 
-        move = self.chooseMove(time)
-        if self.manager.state() == State.SWAP:
-            move = self.swap2str(move)
+        if self.planned and self.manager.state() == State.ACTION:
+            move = self.planned.pop(0)
+        elif self.macro:
+            move, *self.planned = self.chooseMove(time)
         else:
-            move = self.action2str(move)
-        self.manager.addInput(move)
+            move = self.chooseMove(time)
+
+        self.manager.addInput(self.move2str(move))
 
     def chooseMove(self, time=None):
         raise NotImplementedError
 
-    def swap2str(self, swap):
-        out = f'{self.manager.cord2str(swap[0]._pos)} {self.manager.cord2str(swap[1]._pos)}'
-        logging.info('Bot Swap: ' + out)
-        return out
+    def close(self):
+        """
+        Frees what the bot holds on to between searches, such as processes.
+        The bot cannot search afterwards.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
-    def action2str(self, action):
-        if not action:
-            out = ''
+    def searchGame(self):
+        """
+        Returns a private copy of the game to search on, which uses the bot's
+        move cache if it has one.
+        """
+        game = copy.deepcopy(self.manager.game)
+        if self.move_cache is not None:
+            game.move_cache = self.move_cache
+        return game
+
+    def play(self, game, move):
+        """
+        Plays a move, or a whole turn if the bot searches over turns.
+        """
+        if self.macro:
+            game.playTurn(move)
         else:
-            piece = list(action.keys())[0]
-            out = f'{self.manager.cord2str(piece._pos)} '
-            out += ' '.join([self.manager.cord2str(p._pos) for p in action[piece]])
+            game.playMove(move)
+
+    def unplay(self, game, move):
+        """
+        Undoes play(game, move).
+        """
+        for _ in range(len(move) if self.macro else 1):
+            game.undo()
 
-        logging.info('Bot Action: ' + out)
-        return out 
+    def move2str(self, move):
+        out = self.manager.move2str(move)
+        if self.manager.state() == State.SWAP:
+            logging.info('Bot Swap: ' + out)
+        else:
+            logging.info('Bot Action: ' + out)
+        return out
 
 class RandomBot(Bot):
 
     def chooseMove(self, time=None):
         if self.manager.state() == State.SWAP:
-            swaps = list(self.manager.listSwaps())
+            swaps = self.manager.listSwaps()
             return random.choice(swaps)
         else:
             actions = self.manager.listActions()
@@ -0,0 +1,84 @@
+"""
+A cell packs everything the rules need to know about one square of the board
+into a single byte:
+
+    bit   7        6 5 4   3        2 1 0
+          active   hp      colour   kind
+
+The colour bit is 0 for black and 1 for white and is only meaningful while
+the piece is alive (hp > 0). A dead piece keeps its kind so it can still be
+drawn, but the rules treat it exactly like an empty square.
+"""
+
+from typing import Optional
+from colour import Colour
+
+EMPTY = 0
+ARCHER = 1
+KING = 2
+KNIGHT = 3
+MEDIC = 4
+SHIELD = 5
+WIZARD = 6
+
+KINDS = (EMPTY, ARCHER, KING, KNIGHT, MEDIC, SHIELD, WIZARD)
+
+KIND_MASK = 0x07
+COLOUR_BIT = 0x08
+HP_SHIFT = 4
+HP_MASK = 0x70
+ACTIVE_BIT = 0x80
+
+# static properties of each kind, indexed by kind
+MAX_HP = (0, 3, 4, 3, 3, 4, 3)
+BLOCKS = (False, False, False, False, False, True, False)
+SWAPABLE = (False, True, True, True, True, False, True)
+MAX_TRGTS = (1, 1, 1, 2, 4, 1, 1)
+LETTERS = ('*', 'A', 'K', 'N', 'M', 'S', 'W')
+
+
+def packCell(kind: int, colour: Optional[Colour], hp: int, active: bool=False) -> int:
+    """
+    Packs the state of a square into a cell.
+
+    Args:
+        kind: One of the kind constants above.
+        colour: The team the piece belongs to, ignored if hp is 0.
+        hp: The current hit points of the piece.
+        active: Whether the piece is active, ignored if hp is 0.
+
+    Returns:
+        The packed cell.
+    """
+    if hp <= 0:
+        return kind
+
+    cell = kind | (hp << HP_SHIFT)
+    if colour == Colour.WHITE:
+        cell |= COLOUR_BIT
+    if active:
+        cell |= ACTIVE_BIT
+
+    return cell
+
+def cellHp(cell: int) -> int:
+    return (cell & HP_MASK) >> HP_SHIFT
+
+def cellActive(cell: int) -> bool:
+    return bool(cell & ACTIVE_BIT)
+
+def cellColour(cell: int) -> Optional[Colour]:
+    if not cell & HP_MASK:
+        return None
+    return Colour.WHITE if cell & COLOUR_BIT else Colour.BLACK
+
+
+# TEAM[cell] is 0 for dead or empty squares, 1 for black and 2 for white
+TEAM = tuple(0 if not c & HP_MASK else 2 if c & COLOUR_BIT else 1 for c in range(256))
+
+# VALID[cell] is True if packCell can produce cell: a known kind with at most
+# its maximum hp, and nothing but the kind once dead
+VALID = tuple(
+        (c & KIND_MASK) in KINDS and (
+            (c & HP_MASK) >> HP_SHIFT <= MAX_HP[c & KIND_MASK] if c & HP_MASK else c == c & KIND_MASK)
+        for c in range(256))
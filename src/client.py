@@ -40,7 +40,11 @@ class GameClient:
             logging.debug(f'Recieved bad msg: {status_code}:{msg}')
             return
 
-        self.id = int(msg[0])
+        player_id, *dims = msg.split()
+        self.id = int(player_id)
+
+        if dims:
+            self.game = Game(*map(int, dims))
 
     def play(self) -> None:
         if self.id is None:
@@ -69,21 +73,8 @@ class GameClient:
                 request = input('> ') if self.cli_mode else self.getInput()
 
                 self.send(packet.STATUS_CODE_SUCCESS, msg, request)
-            elif cmd == packet.SWAP_CMD:
-                args = msg.split()
-
-                pos1 = self.game._str2cord(args[0])
-                pos2 = self.game._str2cord(args[1])
-
-                self.game.swap(pos1, pos2)
-            elif cmd == packet.ACTION_CMD:
-                args = msg.split()
-
-                if len(args) == 0:
-                    self.game.skipAction()
-                else:
-                    poses = [self.game._str2cord(p) for p in args]
-                    self.game.action(poses[0], poses[1:])
+            elif cmd in (packet.SWAP_CMD, packet.ACTION_CMD):
+                self.game.playMove(self.game.str2move(msg))
             else:
                 logging.warning('Unknown command {cmd}')
                 return
@@ -0,0 +1,171 @@
+"""
+Measures how often maximal action generation (see rules.iterActions) leaves
+out the best action: a knight or medic acting on more of its targets is
+usually, but not always, better for its player than acting on fewer of
+them. Positions are sampled from random games and, for every action that
+maximal generation leaves out, the actions on more targets are searched
+exhaustively to a fixed depth and compared.
+
+Run from src:
+
+    python dominance.py [samples] [depth] [seed]
+"""
+
+import random
+import sys
+from typing import List, NamedTuple, Tuple
+
+from game import Game, State
+from colour import Colour
+from move import Move, MOVE_ACTION
+from cell import KNIGHT, MEDIC, KIND_MASK, HP_MASK, HP_SHIFT, TEAM
+import rules
+
+# the value of a win, more than any difference in hp
+WIN = 1_000_000
+
+
+class Violation(NamedTuple):
+    position: str
+    dominated: Move
+    dominated_value: int
+    dominating: Tuple[Move, ...]
+    dominating_value: int
+
+
+def evaluate(game: Game, team: int) -> int:
+    """
+    Returns the value of the position for team (1 black, 2 white): a win or
+    loss, else the difference in hp between the teams.
+    """
+    if game.won is not None:
+        if game.won == Colour.BOTH:
+            return 0
+        return WIN if game.won.value + 1 == team else -WIN
+
+    hp = [0, 0, 0]
+    for c in game.cells:
+        hp[TEAM[c]] += (c & HP_MASK) >> HP_SHIFT
+
+    return hp[team] - hp[3 - team]
+
+def search(game: Game, depth: int, team: int, a: float=-WIN-1, b: float=WIN+1) -> int:
+    """
+    Returns the exact minimax value of the position for team, searching
+    every distinct move to depth.
+    """
+    if depth == 0 or game.won is not None:
+        return evaluate(game, team)
+
+    maximizing = game.turn.value + 1 == team
+    value = None
+
+    for move in list(game.iterMoves(unique=True)):
+        game.playMove(move)
+        score = search(game, depth - 1, team, a, b)
+        game.undo()
+
+        if maximizing:
+            value = score if value is None else max(value, score)
+            a = max(a, value)
+        else:
+            value = score if value is None else min(value, score)
+            b = min(b, value)
+        if a >= b:
+            break
+
+    return evaluate(game, team) if value is None else value
+
+def dominatedActions(game: Game) -> List[Tuple[Move, Tuple[Move, ...]]]:
+    """
+    Returns the actions of the player to act that maximal generation leaves
+    out, each with the actions of the same piece on more targets.
+    """
+    found = []
+
+    for src in range(len(game.cells)):
+        if game.cells[src] & KIND_MASK not in (KNIGHT, MEDIC) or TEAM[game.cells[src]] != game.turn.value + 1:
+            continue
+
+        every = list(rules.iterActions(game, src))
+        kept = set(rules.iterActions(game, src, maximal=True))
+
+        for targets in every:
+            if targets not in kept:
+                more = tuple((MOVE_ACTION, src, *t) for t in kept if set(targets) < set(t))
+                found.append(((MOVE_ACTION, src, *targets), more))
+
+    return found
+
+def samplePositions(rng: random.Random, samples: int, width: int=4, height: int=4,
+                    max_moves: int=80) -> List[Game]:
+    """
+    Plays random games until samples positions are found where the player
+    to act has a dominated action.
+    """
+    positions = []
+
+    while len(positions) < samples:
+        game = Game(width, height, max_repetitions=3)
+        for _ in range(max_moves):
+            if game.won is not None:
+                break
+            if game.state == State.ACTION and dominatedActions(game) and rng.random() < 0.5:
+                positions.append(Game.fromText(game.toText()))
+                if len(positions) == samples:
+                    break
+            moves = list(game.iterMoves())
+            if not moves:
+                break
+            game.playMove(rng.choice(moves))
+
+    return positions
+
+def verify(samples: int=100, depth: int=2, seed: int=0, width: int=4,
+           height: int=4) -> Tuple[int, List[Violation]]:
+    """
+    Checks that every dominated action is no better than the best action on
+    more targets, searching depth plies past the action.
+
+    Args:
+        samples: The number of positions to check.
+        depth: The number of plies to search after the actions.
+        seed: The seed of the random games.
+        width: The width of the board.
+        height: The height of the board.
+
+    Returns:
+        The number of dominated actions checked and the ones that were
+        better than every action on more targets.
+    """
+    rng = random.Random(seed)
+    checked = 0
+    violations = []
+
+    for game in samplePositions(rng, samples, width, height):
+        team = game.turn.value + 1
+
+        for dominated, dominating in dominatedActions(game):
+            values = []
+            for move in (dominated, *dominating):
+                game.playMove(move)
+                values.append(search(game, depth, team))
+                game.undo()
+
+            checked += 1
+            if values[0] > max(values[1:]):
+                violations.append(Violation(game.toText(), dominated, values[0], dominating, max(values[1:])))
+
+    return checked, violations
+
+
+if __name__ == '__main__':
+    defaults = [100, 2, 0]
+    args = [int(a) for a in sys.argv[1:4]] + defaults[len(sys.argv) - 1:]
+
+    checked, violations = verify(*args)
+
+    for v in violations:
+        print(f'{v.position}: {v.dominated} scores {v.dominated_value}, '
+              f'{v.dominating} at best {v.dominating_value}')
+    print(f'{len(violations)} of {checked} dominated actions did better than acting on more targets')
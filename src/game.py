@@ -1,14 +1,25 @@
 import logging
-from typing import Type, Dict, List, Set, Tuple, Optional
+from typing import Type, Dict, List, Tuple, Optional, Iterator, Sequence
 from enum import Enum
 from queue import Queue
 from copy import deepcopy
 
-from piece import Piece, Pieces, Point, Action
+import rules
+from piece import Piece, Pieces, Point
+from cell import (EMPTY, KING, KIND_MASK, HP_MASK, ACTIVE_BIT, MAX_HP, SWAPABLE, TEAM,
+        LETTERS, VALID, packCell, cellHp)
 from colour import Colour
+from zobrist import ZobristKeys, zobristKeys
+from move import Move, Turn, MOVE_SWAP, MOVE_ACTION, SKIP, swapMove, actionMove
+from geometry import Geometry, boardGeometry, squaresOf
+from snapshot import Snapshot
+from actionspace import ActionSpace, actionSpace
+from movecache import MoveCache
+from layouts import LAYOUTS
 from exceptions import SwapError, ActionError, BoardError, InputError
-from empty import Empty
+# importing the pieces registers their views with Piece.fromCell
 from archer import Archer
+from empty import Empty
 from king import King
 from medic import Medic
 from shield import Shield
@@ -16,33 +27,171 @@ from knight import Knight
 from wizard import Wizard
 
 
+
 class State(Enum):
     SWAP = 0
     ACTION = 1
 
-TeamPieces = Dict[Type[Colour], List[Type[Piece]]]
+# the values of Game.won, in the order toBytes encodes them
+_WINNERS = (None, Colour.BLACK, Colour.WHITE, Colour.BOTH)
+
+# toBytes stores each dimension in 4 bits
+MAX_SIZE = 16
+
+
+def _parseBoard(board: str) -> Tuple[int, int, bytearray]:
+    """
+    Parses the board part of Game.toText.
+
+    Args:
+        board: The rows of the board, separated by '/'.
+
+    Returns:
+        The width and height of the board and its packed cells.
+
+    Raises:
+        BoardError: If board is malformed, a piece has more than its maximum
+                    hp or the rows differ in length.
+    """
+    cells = bytearray()
+    rows = board.split('/')
+    width = None
+
+    for row in rows:
+        start = len(cells)
+        k = 0
+        while k < len(row):
+            if row[k] == '.':
+                cells.append(EMPTY)
+                k += 1
+                continue
+
+            letter, hp = row[k], row[k+1:k+2]
+            if letter.upper() not in LETTERS[1:] or not hp.isdigit():
+                raise BoardError(f'Malformed square "{row[k:k+2]}" in "{board}"')
+
+            kind = LETTERS.index(letter.upper())
+            if int(hp) > MAX_HP[kind]:
+                raise BoardError(f'"{row[k:k+2]}" has more than {MAX_HP[kind]} hp in "{board}"')
+
+            colour = Colour.BLACK if letter.isupper() else Colour.WHITE
+            cells.append(packCell(kind, colour, int(hp)))
+            k += 2
+
+        if width is None:
+            width = len(cells)
+        if len(cells) - start != width or width == 0:
+            raise BoardError(f'Row "{row}" does not have {width} squares')
+
+    return width, len(rows), cells
+
+def _blankBoard(width: int, height: int) -> str:
+    """
+    Returns an empty width by height board in the format of Game.toText.
+    """
+    return '/'.join(['.' * width] * height)
+
+def _unpickleGame(cls, data: bytes, layout: str, max_passes: int,
+                  max_repetitions: Optional[int], history: List['Undo'],
+                  position_counts: Dict[int, int]) -> 'Game':
+    """
+    Inverse of Game.__reduce__.
+    """
+    width, height = (data[0] >> 4) + 1, (data[0] & 15) + 1
+    game = cls(width, height, layout, max_repetitions)
+    game.max_passes = max_passes
+    game.loadBytes(data)
+    game.history = history
+    game.position_counts = position_counts
+    return game
+
+# board, hash, state, turn, black passes, white passes, won, rosters,
+# active_counts, king_masks
+Undo = Tuple[bytes, int, State, Colour, int, int, Optional[Colour],
+        Tuple[int, int], Tuple[int, int], Tuple[int, int]]
 
 class Game:
     """
     Represents the board and game state for Feud.
 
+    The board is stored as a bytearray of packed cells (see cell.py), one per
+    square in row-major order, and every rule runs directly on it. Piece
+    objects are only created on request as views for the GUI.
+
     Attributes:
         WIDTH: The width of the board.
         HEIGHT: The HEIGHT of the board.
+        layout: The starting position, see layouts.py.
         max_passes: The maximum number of passes a player can do before forfeiting.
+        max_repetitions: The game is drawn when a position occurs this many
+                    times, None to never draw by repetition.
         won: The team Colour which has won.
         state: Whether the game is in SWAP or ACTION.
         turn: Whose turn it is to play.
         passes: A dict containing the number of passes for each player.
-        pieces: A dict mapping each position on the board to a piece.
-        team_pieces: A dict which contains a list for each player's pieces.
-        kings: A dict that tracks the location of each team's king.
+        cells: The packed cell of each square on the board.
+        history: A stack of undo records, one per move played.
+        position_counts: How many times each position, by hash, occurred
+                    since the game started or was last loaded.
+        hash: A 64 bit Zobrist hash of the position, updated incrementally.
+        rosters: A bitmask of the squares holding a living piece, per team.
+        active_counts: The number of active pieces, per team.
+        king_masks: A bitmask of the squares holding a living king, per team.
+        geometry: The precomputed tables for the board's dimensions.
+        points: Shortcut to geometry.points.
+        neighbours: Shortcut to geometry.neighbours.
+        action_space: The numbering of moves for the board's dimensions.
+        move_cache: A cache of legal moves used by iterMoves, listSwaps and
+                    listActions, None to always generate them. It is shared
+                    with copies of the game.
     """
 
-    def __init__(self):
-        self.WIDTH: int = 4
-        self.HEIGHT: int = 4
+    # how many moves back snapshot looks for the parent position
+    SNAPSHOT_SEARCH = 4
+
+    def __init__(
+            self,
+            width: int=4,
+            height: int=4,
+            layout: Optional[str]=None,
+            max_repetitions: Optional[int]=None
+            ):
+        """
+        Args:
+            width: The width of the board.
+            height: The height of the board.
+            layout: The starting position in the board format of toText.
+                        Defaults to the layout for the dimensions in
+                        layouts.LAYOUTS.
+            max_repetitions: See the attribute of the same name.
+
+        Raises:
+            BoardError: If there is no layout for the dimensions or layout
+                        does not fit them.
+        """
+        if not (1 <= width <= MAX_SIZE and 1 <= height <= MAX_SIZE):
+            raise BoardError(f'Boards are between 1 and {MAX_SIZE} squares across')
+
+        if layout is None:
+            if (width, height) not in LAYOUTS:
+                raise BoardError(f'No starting layout for a {width}x{height} board')
+            layout = LAYOUTS[(width, height)]
+
+        if _parseBoard(layout)[:2] != (width, height):
+            raise BoardError(f'Layout does not fit a {width}x{height} board')
+
+        self.WIDTH: int = width
+        self.HEIGHT: int = height
+        self.layout: str = layout
         self.max_passes: int = 2
+        self.max_repetitions: Optional[int] = max_repetitions
+        self._keys: ZobristKeys = zobristKeys(self.WIDTH*self.HEIGHT)
+
+        self.geometry: Geometry = boardGeometry(self.WIDTH, self.HEIGHT)
+        self.points: List[Point] = self.geometry.points
+        self.neighbours: List[Tuple[int, ...]] = self.geometry.neighbours
+        self.action_space: ActionSpace = actionSpace(self.WIDTH, self.HEIGHT)
+        self.move_cache: Optional[MoveCache] = None
 
         self.resetBoard()
 
@@ -51,7 +200,7 @@ class Game:
 
         for y in range(self.HEIGHT):
             for x in range(self.WIDTH):
-                out += str(self.pieces[(x, y)])
+                out += str(self.pieceAt((x, y)))
                 if x != self.WIDTH - 1:
                     out += ' | '
             if y != self.HEIGHT - 1:
@@ -64,14 +213,30 @@ class Game:
         result = cls.__new__(cls)
         memo[id(self)] = result
 
-        for k, v in self.__dict__.items():
-            setattr(result, k, deepcopy(v, memo))
-
-        self.findKings()
-        self.addPiecesToTeams()
+        result.__dict__.update(self.__dict__)
+        result.cells = bytearray(self.cells)
+        result.passes = dict(self.passes)
+        result.history = list(self.history)
+        result.position_counts = dict(self.position_counts)
+        result.rosters = list(self.rosters)
+        result.active_counts = list(self.active_counts)
+        result.king_masks = list(self.king_masks)
 
         return result
 
+    @property
+    def pieces(self) -> Pieces:
+        """
+        A dict mapping each position on the board to a view of its piece.
+        """
+        return {p: Piece.fromCell(self.cells[i], p) for i, p in enumerate(self.points)}
+
+    def pieceAt(self, pos: Point) -> Piece:
+        """
+        Returns a view of the piece at pos.
+        """
+        return Piece.fromCell(self.cells[self._index(pos)], pos)
+
     def resetBoard(self) -> None:
         """
         Changes the board's state so that it is ready for a new game.
@@ -84,21 +249,411 @@ class Game:
         self.turn: Colour = Colour.BLACK
         self.passes: Dict[Type[Colour], int] = {Colour.BLACK:0, Colour.WHITE:0}
 
-        self.pieces: Pieces = {
-                (x, y):Empty((x,y))
-                for x in range(self.WIDTH) for y in range(self.HEIGHT)}
-
-        self.team_pieces: TeamPieces = {Colour.BLACK: [], Colour.WHITE: []}
-        self.kings: Dict[Type[Colour], Piece] = {Colour.BLACK:None, Colour.WHITE:None}
+        self.cells: bytearray = bytearray(self.WIDTH*self.HEIGHT)
+        self.history: List[Undo] = []
+        # an empty board with black to swap and no passes hashes to 0
+        self._hash: int = 0
+        # indexed by Colour.value, kept up to date by setCell
+        self.rosters: List[int] = [0, 0]
+        self.active_counts: List[int] = [0, 0]
+        self.king_masks: List[int] = [0, 0]
         self.setBoard()
-        self.findKings()
-        self.addPiecesToTeams()
+        self._setLoser(self.isolated() or self.kingDead())
+        self.position_counts: Dict[int, int] = {self._hash: 1}
+
+    @property
+    def hash(self) -> int:
+        return self._hash
+
+    def computeHash(self) -> int:
+        """
+        Computes the Zobrist hash of the position from scratch. It always
+        equals the incrementally maintained hash property.
+
+        Returns:
+            The 64 bit hash of the position.
+        """
+        return self._keys.positionHash(
+                self.cells,
+                self.turn == Colour.WHITE,
+                self.state == State.ACTION,
+                (self.passes[Colour.BLACK], self.passes[Colour.WHITE]))
+
+    def _pushUndo(self) -> None:
+        """
+        Records everything a move can change so that undo can revert it.
+        """
+        self.history.append((
+                bytes(self.cells),
+                self._hash,
+                self.state,
+                self.turn,
+                self.passes[Colour.BLACK],
+                self.passes[Colour.WHITE],
+                self.won,
+                tuple(self.rosters),
+                tuple(self.active_counts),
+                tuple(self.king_masks)))
+
+    def undo(self) -> None:
+        """
+        Reverts the last swap, action or skip, restoring the board, turn,
+        state, passes and winner exactly as they were before it.
+
+        Returns:
+            None
+
+        Raises:
+            BoardError: If there is no move to undo.
+        """
+        if not self.history:
+            raise BoardError('No move to undo')
+
+        count = self.position_counts[self._hash] - 1
+        if count:
+            self.position_counts[self._hash] = count
+        else:
+            del self.position_counts[self._hash]
+
+        (cells, self._hash, self.state, self.turn, black, white, self.won,
+                rosters, active_counts, king_masks) = self.history.pop()
+
+        self.cells[:] = cells
+        self.rosters[:] = rosters
+        self.active_counts[:] = active_counts
+        self.king_masks[:] = king_masks
+        self.passes[Colour.BLACK] = black
+        self.passes[Colour.WHITE] = white
+
+    def snapshot(self, parent: Optional[Snapshot]=None) -> Snapshot:
+        """
+        Takes an immutable snapshot of the position. If parent is the position
+        a few moves back along the undo history, only the squares that
+        changed since then are stored and the rest is shared with parent.
+
+        Args:
+            parent: A snapshot of an earlier position of this game.
+
+        Returns:
+            The snapshot of the current position.
+        """
+        passes = (self.passes[Colour.BLACK], self.passes[Colour.WHITE])
+        base = None
+
+        if parent is not None and parent.generation + 1 < Snapshot.KEYFRAME_INTERVAL:
+            for record in reversed(self.history[-self.SNAPSHOT_SEARCH:]):
+                if record[1] == parent.hash:
+                    base = record[0]
+                    break
+
+        if base is None:
+            return Snapshot(None, bytes(self.cells), None,
+                    self.state, self.turn, passes, self.won, self._hash)
+
+        cells = self.cells
+        diff = int.from_bytes(base, 'little') ^ int.from_bytes(cells, 'little')
+        changes = bytearray()
+
+        # visit only the bytes that differ
+        while diff:
+            i = ((diff & -diff).bit_length() - 1) >> 3
+            changes += bytes((i, cells[i]))
+            diff &= ~(0xFF << (i << 3))
+
+        return Snapshot(parent, None, bytes(changes),
+                self.state, self.turn, passes, self.won, self._hash)
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """
+        Sets the position to snapshot. The undo history is cleared since it
+        no longer leads to the position.
+
+        Args:
+            snapshot: A snapshot taken from a game of the same dimensions.
+
+        Returns:
+            None
+        """
+        self.cells[:] = snapshot.cells()
+        self.state = snapshot.state
+        self.turn = snapshot.turn
+        self.passes[Colour.BLACK], self.passes[Colour.WHITE] = snapshot.passes
+        self.won = snapshot.won
+        self._hash = snapshot.hash
+        self._recount()
+        self._clearHistory()
+
+    def _clearHistory(self) -> None:
+        """
+        Forgets the moves and positions that led to the current position.
+        """
+        self.history = []
+        self.position_counts = {self._hash: 1}
+
+    def repetitions(self) -> int:
+        """
+        Returns how many times the current position has occurred, counting
+        itself, along the moves that led to it.
+        """
+        return self.position_counts.get(self._hash, 0)
+
+    def _recordPosition(self) -> None:
+        """
+        Counts the position a move just reached and draws the game if it
+        occurred max_repetitions times.
+        """
+        count = self.position_counts.get(self._hash, 0) + 1
+        self.position_counts[self._hash] = count
+
+        if (self.won is None
+                and self.max_repetitions is not None
+                and count >= self.max_repetitions):
+            self.won = Colour.BOTH
+
+    def _recount(self) -> None:
+        """
+        Rebuilds rosters, active_counts and king_masks from the cells.
+        """
+        self.rosters[:] = [0, 0]
+        self.active_counts[:] = [0, 0]
+        self.king_masks[:] = [0, 0]
+
+        for i, cell in enumerate(self.cells):
+            if team := TEAM[cell]:
+                self.rosters[team - 1] |= 1 << i
+                if cell & ACTIVE_BIT:
+                    self.active_counts[team - 1] += 1
+                if cell & KIND_MASK == KING:
+                    self.king_masks[team - 1] |= 1 << i
+
+    def _checkPasses(self, black: int, white: int, won: Optional[Colour]) -> None:
+        """
+        Raises BoardError if a game could not have reached the passes with
+        winner won: passing more than max_passes times loses the game.
+        """
+        most = max(black, white)
+
+        if most > self.max_passes + 1 or (won is None and most > self.max_passes):
+            raise BoardError(f'{black}-{white} passes cannot occur in a game '
+                             f'{"in play" if won is None else "that is over"}')
+
+    def toBytes(self) -> bytes:
+        """
+        Encodes the position in a fixed size of 4 + WIDTH*HEIGHT bytes:
+
+            byte 0      (WIDTH - 1) << 4 | (HEIGHT - 1)
+            byte 1      bit 0 white to play, bit 1 ACTION state,
+                        bits 2-3 the winner (0 none, 1 black, 2 white, 3 both)
+            byte 2, 3   the passes of black and white
+            byte 4...   the packed cells, see cell.py
+
+        Returns:
+            The encoded position.
+        """
+        flags = self.turn.value | self.state.value << 1 | _WINNERS.index(self.won) << 2
+
+        return bytes((
+                (self.WIDTH - 1) << 4 | (self.HEIGHT - 1),
+                flags,
+                min(self.passes[Colour.BLACK], 255),
+                min(self.passes[Colour.WHITE], 255))) + bytes(self.cells)
+
+    def loadBytes(self, data: bytes) -> None:
+        """
+        Inverse of toBytes, sets the position to the one encoded in data. The
+        undo history is cleared.
+
+        Args:
+            data: An encoded position.
+
+        Returns:
+            None
+
+        Raises:
+            BoardError: If data does not encode a position for this board.
+        """
+        if len(data) != 4 + len(self.cells):
+            raise BoardError(f'Expected {4 + len(self.cells)} bytes, got {len(data)}')
+
+        if data[0] != (self.WIDTH - 1) << 4 | (self.HEIGHT - 1):
+            raise BoardError('Position is for a board of different dimensions')
+
+        flags = data[1]
+
+        if flags >> 4:
+            raise BoardError(f'Invalid flags {flags:#x}')
+
+        for i, cell in enumerate(data[4:]):
+            if not VALID[cell]:
+                raise BoardError(f'Invalid cell {cell:#x} at square {i}')
+
+        self._checkPasses(data[2], data[3], _WINNERS[flags >> 2 & 3])
+
+        self.turn = Colour.WHITE if flags & 1 else Colour.BLACK
+        self.state = State.ACTION if flags & 2 else State.SWAP
+        self.won = _WINNERS[flags >> 2 & 3]
+        self.passes[Colour.BLACK] = data[2]
+        self.passes[Colour.WHITE] = data[3]
+        self.cells[:] = data[4:]
+        self._recount()
+        self._hash = self.computeHash()
+        self._clearHistory()
+
+    @classmethod
+    def fromBytes(cls, data: bytes, layout: Optional[str]=None) -> 'Game':
+        """
+        Creates a game, of the dimensions encoded in data, in the position
+        encoded by toBytes.
+
+        Args:
+            data: An encoded position.
+            layout: The starting position resetBoard goes back to. Defaults
+                        to the layout for the dimensions in layouts.LAYOUTS,
+                        else the decoded position.
+
+        Returns:
+            The game.
+
+        Raises:
+            BoardError: If data does not encode a position.
+        """
+        if not data:
+            raise BoardError('Expected at least one byte')
+
+        width, height = (data[0] >> 4) + 1, (data[0] & 15) + 1
+        game = cls(width, height, layout=layout or LAYOUTS.get((width, height), _blankBoard(width, height)))
+        game.loadBytes(data)
+        if layout is None and (width, height) not in LAYOUTS:
+            game.layout = game._boardText()
+        return game
+
+    def toText(self) -> str:
+        """
+        Encodes the position as a single line of text, similar to FEN in chess.
+        The board comes first, one row per '/' from the top, with one token per
+        square: '.' for an empty square, else the letter of the piece (upper
+        case black, lower case white, see cell.LETTERS) followed by its hp.
+        Then come the side to play (b/w), the state (s/a), the passes of black
+        and white and the winner (-, b, w or x for both). For example the
+        starting position is:
+
+            A3K4M3A3/N3S3W3N3/n3s4w3n3/a3k4m3a3 b s 0-0 -
+
+        Returns:
+            The encoded position.
+        """
+        turn = 'w' if self.turn == Colour.WHITE else 'b'
+        state = 'a' if self.state == State.ACTION else 's'
+        passes = f'{self.passes[Colour.BLACK]}-{self.passes[Colour.WHITE]}'
+        won = '-bwx'[_WINNERS.index(self.won)]
+
+        return f'{self._boardText()} {turn} {state} {passes} {won}'
+
+    def _boardText(self) -> str:
+        """
+        Returns the board part of toText, which is also the format of layout.
+        """
+        rows = []
+        width = self.WIDTH
+
+        for y in range(self.HEIGHT):
+            row = ''
+            for cell in self.cells[y*width:(y+1)*width]:
+                kind = cell & KIND_MASK
+                if kind == EMPTY:
+                    row += '.'
+                else:
+                    letter = LETTERS[kind]
+                    row += (letter.lower() if TEAM[cell] == 2 else letter) + str(cellHp(cell))
+            rows.append(row)
+
+        return '/'.join(rows)
+
+    def loadText(self, text: str) -> None:
+        """
+        Inverse of toText, sets the position to the one described by text.
+        Activity flags are worked out from the board. The undo history is
+        cleared.
+
+        Args:
+            text: A position in the format of toText.
+
+        Returns:
+            None
+
+        Raises:
+            BoardError: If text does not describe a position for this board.
+        """
+        try:
+            board, turn, state, passes, won = text.split()
+            black, white = (int(p) for p in passes.split('-'))
+        except ValueError:
+            raise BoardError(f'Malformed position "{text}"')
+
+        if (turn not in ('b', 'w')
+                or state not in ('s', 'a')
+                or won not in '-bwx' or len(won) != 1):
+            raise BoardError(f'Malformed position "{text}"')
+
+        width, height, cells = _parseBoard(board)
+
+        if (width, height) != (self.WIDTH, self.HEIGHT):
+            raise BoardError('Position is for a board of different dimensions')
+
+        self._checkPasses(black, white, _WINNERS['-bwx'.index(won)])
+
+        self.turn = Colour.WHITE if turn == 'w' else Colour.BLACK
+        self.state = State.ACTION if state == 'a' else State.SWAP
+        self.won = _WINNERS['-bwx'.index(won)]
+        self.passes[Colour.BLACK] = black
+        self.passes[Colour.WHITE] = white
+        self.cells[:] = cells
+        for i in range(len(self.cells)):
+            self._updateActivity(i)
+        self._recount()
+        self._hash = self.computeHash()
+        self._clearHistory()
+
+    @classmethod
+    def fromText(cls, text: str, layout: Optional[str]=None) -> 'Game':
+        """
+        Creates a game, of the dimensions of the board in text, in the
+        position described by toText.
+
+        Args:
+            text: A position in the format of toText.
+            layout: The starting position resetBoard goes back to. Defaults
+                        to the layout for the dimensions in layouts.LAYOUTS,
+                        else the board in text.
+
+        Returns:
+            The game.
+
+        Raises:
+            BoardError: If text does not describe a position.
+        """
+        board = text.split(maxsplit=1)[0] if text.strip() else ''
+        width, height, _ = _parseBoard(board)
+        game = cls(width, height, layout=layout or LAYOUTS.get((width, height), _blankBoard(width, height)))
+        game.loadText(text)
+        if layout is None and (width, height) not in LAYOUTS:
+            game.layout = board
+        return game
+
+    def __reduce__(self):
+        # pickle the compact encoding and what it leaves out, rather than the
+        # shared lookup tables
+        return (_unpickleGame, (self.__class__, self.toBytes(), self.layout, self.max_passes,
+                self.max_repetitions, self.history, self.position_counts))
+
+    def _index(self, pos: Point) -> int:
+        return pos[0] + pos[1]*self.WIDTH
 
     def _str2cord(self, string: str) -> Tuple[int, int]:
         """
         Converts a string that represents a coordinate on the board to a tuple
-        containing the (col, row) indices. The string must be in the following
-        format: [a-d][1-4]
+        containing the (col, row) indices. The string must be a column letter
+        followed by a row number, e.g. a1, d4 or b12 on a larger board.
 
         Args:
             string: The coordinate string.
@@ -109,14 +664,11 @@ class Game:
         Raises:
             InputError: If string is not in the correct format.
         """
-        if len(string) != 2:
-            raise InputError('Too many characters provided as coordinate')
+        if len(string) < 2 or not string[0].isalpha() or not string[1:].isdigit():
+            raise InputError(f'Coordinate must be in the format {self._cordFormat()}')
 
-        try:
-            col = ord(string[0].lower()) - ord('a')
-            row = int(string[1]) - 1
-        except TypeError as e:
-            raise InputError('Coordinate must be in the format [a-d][1-4]')
+        col = ord(string[0].lower()) - ord('a')
+        row = int(string[1:]) - 1
 
         return (col, row)
 
@@ -130,10 +682,13 @@ class Game:
 
         Returns:
             A string representation of the board coordinate. Will be in the
-            following format: [a-d][1-4]
+            following format: [a-d][1-4] on a 4x4 board
         """
         return chr(cord[0] + ord('a')) + str(cord[1] + 1)
 
+    def _cordFormat(self) -> str:
+        last = self._cord2str((self.WIDTH - 1, self.HEIGHT - 1))
+        return f'[a-{last[0]}][1-{last[1:]}]'
 
     def _winnerFromBools(self, black: bool, white: bool) -> Colour:
         """
@@ -155,6 +710,17 @@ class Game:
         else:
             return None
 
+    def _setLoser(self, loser: Optional[Colour]) -> None:
+        """
+        Updates won according to the colour which has lost, if any.
+        """
+        if loser == Colour.BLACK:
+            self.won = Colour.WHITE
+        elif loser == Colour.WHITE:
+            self.won = Colour.BLACK
+        elif loser == Colour.BOTH:
+            self.won = Colour.BOTH
+
     def isolated(self) -> Colour:
         """
         Checks if either team is isolated.
@@ -162,10 +728,7 @@ class Game:
         Returns:
             The colour which is isolated.
         """
-        black = sum([p._active for p in self.team_pieces[Colour.BLACK]]) == 0
-        white = sum([p._active for p in self.team_pieces[Colour.WHITE]]) == 0
-
-        return self._winnerFromBools(black, white)
+        return self._winnerFromBools(self.active_counts[0] == 0, self.active_counts[1] == 0)
 
 
     def kingDead(self) -> Colour:
@@ -175,10 +738,13 @@ class Game:
         Returns:
             The colour for which the king is dead.
         """
-        black = self.kings[Colour.BLACK]._hp <= 0
-        white = self.kings[Colour.WHITE]._hp <= 0
+        return self._winnerFromBools(self.king_masks[0] == 0, self.king_masks[1] == 0)
 
-        return self._winnerFromBools(black, white)
+    def aliveCount(self, colour: Colour) -> int:
+        """
+        Returns the number of living pieces colour has.
+        """
+        return bin(self.rosters[colour.value]).count('1')
 
     def tooManyPasses(self) -> Colour:
         """
@@ -192,65 +758,65 @@ class Game:
 
         return self._winnerFromBools(black, white)
 
-    def setBoard(self) -> None:
+    def setCell(self, i: int, cell: int) -> None:
         """
-        Configures the pieces in their starting position and updates their
-        activity flags.
+        Overwrites the cell of square i. Every change to the board goes
+        through here.
+
+        Args:
+            i: The index of the square.
+            cell: The new packed cell.
 
         Returns:
             None
         """
-        # first row
-        self.pieces[(0, 0)] = Archer(Colour.BLACK, (0, 0))
-        self.pieces[(1, 0)] = King(Colour.BLACK, (1, 0))
-        self.pieces[(2, 0)] = Medic(Colour.BLACK, (2, 0))
-        self.pieces[(3, 0)] = Archer(Colour.BLACK, (3, 0))
-        # second row
-        self.pieces[(0, 1)] = Knight(Colour.BLACK, (0, 1))
-        self.pieces[(1, 1)] = Shield(Colour.BLACK, (1, 1), hp=3)
-        self.pieces[(2, 1)] = Wizard(Colour.BLACK, (2, 1))
-        self.pieces[(3, 1)] = Knight(Colour.BLACK, (3, 1))
-        # third row
-        self.pieces[(0, 2)] = Knight(Colour.WHITE, (0, 2))
-        self.pieces[(1, 2)] = Shield(Colour.WHITE, (1, 2))
-        self.pieces[(2, 2)] = Wizard(Colour.WHITE, (2, 2))
-        self.pieces[(3, 2)] = Knight(Colour.WHITE, (3, 2))
-        # forth row
-        self.pieces[(0, 3)] = Archer(Colour.WHITE, (0, 3))
-        self.pieces[(1, 3)] = King(Colour.WHITE, (1, 3))
-        self.pieces[(2, 3)] = Medic(Colour.WHITE, (2, 3))
-        self.pieces[(3, 3)] = Archer(Colour.WHITE, (3, 3))
-        # activate pieces
-        for p in self.pieces:
-            self.pieces[p].updateActivity(self.pieces)
-
-    def findKings(self) -> None:
+        old = self.cells[i]
+        keys = self._keys.cells[i]
+        self._hash ^= keys[old] ^ keys[cell]
+        self.cells[i] = cell
+
+        bit = 1 << i
+
+        if team := TEAM[old]:
+            self.rosters[team - 1] ^= bit
+            if old & ACTIVE_BIT:
+                self.active_counts[team - 1] -= 1
+            if old & KIND_MASK == KING:
+                self.king_masks[team - 1] ^= bit
+
+        if team := TEAM[cell]:
+            self.rosters[team - 1] ^= bit
+            if cell & ACTIVE_BIT:
+                self.active_counts[team - 1] += 1
+            if cell & KIND_MASK == KING:
+                self.king_masks[team - 1] ^= bit
+
+    def _updateActivity(self, i: int) -> None:
         """
-        Sets the kings variable to track the location of the kings.
-
-        Returns:
-            None
+        Recomputes the activity flag of the piece on square i. A piece is
+        active while it is alive and next to a living piece of its own team.
         """
+        cells = self.cells
+        cell = cells[i]
+        team = TEAM[cell]
+        active = team != 0 and any(TEAM[cells[n]] == team for n in self.neighbours[i])
 
-        for p in self.pieces:
-            piece = self.pieces[p]
-
-            if type(piece) is King and piece._colour:
-                self.kings[piece._colour] = piece
+        if active != bool(cell & ACTIVE_BIT):
+            self.setCell(i, cell ^ ACTIVE_BIT)
 
-    def addPiecesToTeams(self) -> None:
+    def setBoard(self) -> None:
         """
-        Sets the self.team_pieces dict.
+        Configures the pieces in their starting position, see layout, and
+        updates their activity flags.
 
         Returns:
             None
         """
-        self.team_pieces[Colour.BLACK].clear()
-        self.team_pieces[Colour.WHITE].clear()
-
-        for i in self.pieces:
-            if self.pieces[i]._colour is not None:
-                self.team_pieces[self.pieces[i]._colour].append(self.pieces[i])
+        for i, cell in enumerate(_parseBoard(self.layout)[2]):
+            self.setCell(i, cell)
+        # activate pieces
+        for i in range(len(self.cells)):
+            self._updateActivity(i)
 
     def _inbound(self, pos: Point) -> bool:
         """
@@ -262,7 +828,21 @@ class Game:
         Returns:
             True if pos is within the board dimensions, else False.
         """
-        return 0 <= pos[0] <= self.WIDTH and 0 <= pos[1] <= self.HEIGHT
+        return 0 <= pos[0] < self.WIDTH and 0 <= pos[1] < self.HEIGHT
+
+    def _canSwap(self, i: int, j: int) -> bool:
+        """
+        Checks if the piece on square i can initiate a swap with square j.
+        """
+        cells = self.cells
+        mover = cells[i]
+        other = cells[j]
+        team = TEAM[mover]
+
+        return (mover & ACTIVE_BIT
+                and team == self.turn.value + 1
+                and self.geometry.neighbour_masks[i] >> j & 1
+                and (TEAM[other] == team or (other & HP_MASK and SWAPABLE[other & KIND_MASK])))
 
     def canSwap(self, pos1: Point, pos2: Point) -> bool:
         """
@@ -280,11 +860,10 @@ class Game:
                 or not self._inbound(pos2)):
             return False
 
-        p1 = self.pieces[pos1]
-        p2 = self.pieces[pos2]
+        i = self._index(pos1)
+        j = self._index(pos2)
 
-        return ((p1._colour == self.turn and p1.canSwap(p2))
-                or (p2._colour == self.turn and p2.canSwap(p1)))
+        return bool(self._canSwap(i, j) or self._canSwap(j, i))
 
     def swap(self, pos1: Point, pos2: Point, notify=None) -> None:
         """
@@ -303,34 +882,28 @@ class Game:
         if not self.canSwap(pos1, pos2):
             raise SwapError(f'{pos1=} and {pos2=} cannot be swapped') 
 
-        p1 = self.pieces[pos1]
-        p2 = self.pieces[pos2]
+        self._swap(self._index(pos1), self._index(pos2), notify)
 
-        p1.applySwap(p2)
+    def _swap(self, i: int, j: int, notify=None) -> None:
+        """
+        Swaps squares i and j without checking that it is legal.
+        """
+        self._pushUndo()
 
-        self.pieces[pos1], self.pieces[pos2] = p2, p1
+        c1 = self.cells[i]
+        self.setCell(i, self.cells[j])
+        self.setCell(j, c1)
 
         # update activity of pieces and neighbours
-        for i in p1.neighbourPositions():
-            self.pieces[i].updateActivity(self.pieces)
+        for n in self.neighbours[j] + self.neighbours[i]:
+            self._updateActivity(n)
             if notify is not None:
-                notify(i)
-
-        for i in p2.neighbourPositions():
-            self.pieces[i].updateActivity(self.pieces)
-            if notify is not None:
-                notify(i)
+                notify(self.points[n])
 
         self.state = State.ACTION
-
-        loser = self.isolated()
-
-        if loser == Colour.BLACK:
-            self.won = Colour.WHITE
-        elif loser == Colour.WHITE:
-            self.won = Colour.BLACK
-        elif loser == Colour.BOTH:
-            self.won = Colour.BOTH
+        self._hash ^= self._keys.action
+        self._setLoser(self.isolated())
+        self._recordPosition()
 
     def canAction(self, pos: Point, targets: List[Point]) -> bool:
         """
@@ -345,13 +918,19 @@ class Game:
         """
         if (self.state != State.ACTION
                 or not self._inbound(pos)
-                or self.pieces[pos]._colour != self.turn
                 or sum([not self._inbound(p) for p in targets])):
             return False
 
-        trgts = [self.pieces[p] for p in targets]
+        return self._canAction(self._index(pos), tuple(self._index(p) for p in targets))
 
-        return self.pieces[pos].canAction(trgts, self.pieces)
+    def _canAction(self, src: int, targets: Tuple[int, ...]) -> bool:
+        """
+        Checks if the current player's piece on square src can act on targets.
+        """
+        if TEAM[self.cells[src]] != self.turn.value + 1:
+            return False
+
+        return rules.canAction(self, src, targets)
 
     def action(self, pos: Point, targets: List[Point], notify=None) -> None:
         """
@@ -370,38 +949,48 @@ class Game:
         if not self.canAction(pos, targets):
             raise ActionError(f'Can\'t perform action {pos} {targets}')
 
-        action_piece = self.pieces[pos]
-        trgts = [self.pieces[p] for p in targets]
-
-        action_piece.applyAction(trgts, self.pieces)
-        action_piece.updateActivity(self.pieces)
+        self._action(self._index(pos), tuple(self._index(p) for p in targets), notify)
 
-        if notify is not None:
-            notify(action_piece._pos)
+    def _action(self, src: int, trgts: Tuple[int, ...], notify=None) -> None:
+        """
+        Performs the action of the piece on square src without checking that
+        it is legal.
+        """
+        self._pushUndo()
 
-        for piece in trgts:
-            piece.updateActivity(self.pieces)
+        rules.applyAction(self, src, trgts)
 
+        for i in (src,) + trgts:
+            self._updateActivity(i)
             if notify is not None:
-                notify(piece._pos)
+                notify(self.points[i])
 
-            for i in piece.neighbourPositions():
-                self.pieces[i].updateActivity(self.pieces)
+            for n in self.neighbours[i]:
+                self._updateActivity(n)
                 if notify is not None:
-                    notify(i)
+                    notify(self.points[n])
 
-        self.passes[self.turn] = 0
-        self.state = State.SWAP
-        self.turn = Colour.BLACK if self.turn == Colour.WHITE else Colour.WHITE
+        self._endTurn(0)
+        self._setLoser(self.isolated() or self.kingDead())
+        self._recordPosition()
 
-        loser = self.isolated() or self.kingDead()
+    def _endTurn(self, passes: int) -> None:
+        """
+        Sets the pass count of the current player and hands the turn over to
+        the other player's swap.
+        """
+        keys = self._keys
+        value = self.turn.value
 
-        if loser == Colour.BLACK:
-            self.won = Colour.WHITE
-        elif loser == Colour.WHITE:
-            self.won = Colour.BLACK
-        elif loser == Colour.BOTH:
-            self.won = Colour.BOTH
+        self._hash ^= keys.passKey(value, self.passes[self.turn]) ^ keys.passKey(value, passes)
+        self.passes[self.turn] = passes
+
+        if self.state == State.ACTION:
+            self._hash ^= keys.action
+        self.state = State.SWAP
+
+        self._hash ^= keys.turn
+        self.turn = Colour.BLACK if self.turn == Colour.WHITE else Colour.WHITE
 
     def skipAction(self) -> None:
         """
@@ -410,53 +999,378 @@ class Game:
         Returns:
             None
         """
-        self.passes[self.turn] += 1
-        self.state = State.SWAP
-        self.turn = Colour.BLACK if self.turn == Colour.WHITE else Colour.WHITE
+        self._pushUndo()
+        self._endTurn(self.passes[self.turn] + 1)
+        self._setLoser(self.tooManyPasses())
+        self._recordPosition()
 
-        loser = self.tooManyPasses()
+    def isLegal(self, move: Move) -> bool:
+        """
+        Checks if move can be played in the current position.
 
-        if loser == Colour.BLACK:
-            self.won = Colour.WHITE
-        elif loser == Colour.WHITE:
-            self.won = Colour.BLACK
-        elif loser == Colour.BOTH:
-            self.won = Colour.BOTH
+        Args:
+            move: The move to check, see move.py.
 
-    def listSwaps(self) -> Set[Tuple[Piece]]:
+        Returns:
+            True if the move is legal, else False.
         """
-        Returns the legal swaps.
+        size = len(self.cells)
+
+        if not all(0 <= i < size for i in move[1:]):
+            return False
+
+        if move[0] == MOVE_SWAP:
+            return (self.state == State.SWAP
+                    and len(move) == 3
+                    and bool(self._canSwap(move[1], move[2]) or self._canSwap(move[2], move[1])))
+        elif move[0] == MOVE_ACTION:
+            return (self.state == State.ACTION
+                    and len(move) >= 3
+                    and self._canAction(move[1], move[2:]))
+
+        return move == SKIP and self.state == State.ACTION
+
+    def playMove(self, move: Move, notify=None) -> None:
+        """
+        Plays a move from listSwaps or listActions. The move is not checked,
+        use isLegal for moves from other sources.
+
+        Args:
+            move: The move to play, see move.py.
+
+        Returns:
+            None
+        """
+        kind = move[0]
+
+        if kind == MOVE_SWAP:
+            self._swap(move[1], move[2], notify)
+        elif kind == MOVE_ACTION:
+            self._action(move[1], move[2:], notify)
+        else:
+            self.skipAction()
+
+    def playTurn(self, turn: Turn, notify=None) -> None:
+        """
+        Plays the moves of a turn from iterTurns, see playMove. Undoing the
+        turn takes one undo per move.
+
+        Args:
+            turn: The moves to play.
+
+        Returns:
+            None
+        """
+        for move in turn:
+            self.playMove(move, notify)
+
+    def iterSwaps(self, unique: bool=False) -> Iterator[Move]:
+        """
+        Yields the legal swaps one at a time, so callers that stop early
+        never generate the rest.
+
+        Args:
+            unique: Whether to yield only the first of the swaps that lead to
+                        the same position.
+
+        Returns:
+            An iterator over swap moves, each appearing once.
+        """
+        if self.state != State.SWAP:
+            return
+
+        cells = self.cells
+        team = self.turn.value + 1
+        # every other swap changes the board in its own way, only swapping
+        # two identical pieces leaves it as it was
+        noop_seen = False
+
+        for i in squaresOf(self.rosters[team - 1]):
+            for j in self.neighbours[i]:
+                other = cells[j]
+                # swaps between two active team mates are listed from the lower square
+                if j < i and TEAM[other] == team and other & ACTIVE_BIT:
+                    continue
+                if self._canSwap(i, j):
+                    if unique and not (cells[i] ^ other) & ~ACTIVE_BIT:
+                        if noop_seen:
+                            continue
+                        noop_seen = True
+                    yield swapMove(i, j)
+
+    def iterActions(
+            self,
+            order: Optional[Sequence[int]]=None,
+            skip_last: bool=False,
+            unique: bool=False,
+            maximal: bool=False
+            ) -> Iterator[Move]:
+        """
+        Yields the legal actions one at a time, so callers that stop early
+        never generate the rest.
+
+        Args:
+            order: The kinds of piece (see cell.py) to generate actions for,
+                        in the order they should be visited. Defaults to
+                        every piece in square order.
+            skip_last: Whether the skip action comes last instead of first.
+            unique: Whether to yield only the first of the actions that lead
+                        to the same position, see rules.actionOutcome.
+            maximal: Whether to leave out the knight and medic actions that
+                        act on fewer targets than another action of the
+                        same piece, see rules.iterActions.
+
+        Returns:
+            An iterator over action moves.
+        """
+        if not skip_last:
+            yield SKIP
+
+        if self.state == State.ACTION:
+            cells = self.cells
+            roster = self.rosters[self.turn.value]
+
+            if order is None:
+                squares = squaresOf(roster)
+            else:
+                squares = (i for kind in order for i in squaresOf(roster) if cells[i] & KIND_MASK == kind)
+
+            seen = set()
+
+            for i in squares:
+                for targets in rules.iterActions(self, i, maximal):
+                    if unique:
+                        outcome = rules.actionOutcome(self, i, targets)
+                        if outcome in seen:
+                            continue
+                        seen.add(outcome)
+                    yield (MOVE_ACTION, i, *targets)
+
+        if skip_last:
+            yield SKIP
+
+    def iterMoves(
+            self,
+            order: Optional[Sequence[int]]=None,
+            skip_last: bool=False,
+            unique: bool=False,
+            maximal: bool=False
+            ) -> Iterator[Move]:
+        """
+        Yields the legal swaps or actions, depending on the state. See
+        iterActions for the arguments. The game may be changed between two
+        moves, for example to search a move, as long as it is undone before
+        the next one is requested.
+
+        The moves come from move_cache, if there is one, unless order is given.
+        """
+        if self.move_cache is not None and order is None:
+            moves = self._cachedMoves(unique, maximal)
+            if skip_last and self.state == State.ACTION:
+                return iter(moves[1:] + (SKIP,))
+            return iter(moves)
+
+        if self.state == State.SWAP:
+            return self.iterSwaps(unique)
+        return self.iterActions(order, skip_last, unique, maximal)
+
+    def _cachedMoves(self, unique: bool, maximal: bool=False) -> Tuple[Move, ...]:
+        """
+        Returns the legal moves from move_cache, the skip action first.
+        """
+        def generate():
+            if self.state == State.SWAP:
+                return tuple(self.iterSwaps(unique))
+            return tuple(self.iterActions(unique=unique, maximal=maximal))
+
+        return self.move_cache.get((self._hash, unique, maximal), generate)
+
+    def iterTurns(
+            self,
+            order: Optional[Sequence[int]]=None,
+            skip_last: bool=False,
+            maximal: bool=False
+            ) -> Iterator[Turn]:
+        """
+        Yields the rest of the current turn as whole turns, a swap followed by
+        an action, so a search can treat a turn as a single ply. Only the
+        first of the turns that lead to the same position is yielded. In the
+        ACTION state every turn is a single action, and a swap that ends the
+        game makes a turn on its own. See iterActions for the arguments.
+
+        Each turn is played and undone once to find the position it leads to,
+        the game is back as it was whenever a turn is yielded.
+
+        Returns:
+            An iterator over turns, see move.py.
+        """
+        if self.won is not None:
+            return
+
+        if self.state == State.ACTION:
+            for action in self.iterActions(order, skip_last, True, maximal):
+                yield (action,)
+            return
+
+        seen = set()
+
+        for swap in self.iterSwaps(unique=True):
+            turns = []
+            self.playMove(swap)
+
+            if self.won is not None:
+                if self._hash not in seen:
+                    seen.add(self._hash)
+                    turns.append((swap,))
+            else:
+                for action in list(self.iterActions(order, skip_last, True, maximal)):
+                    self.playMove(action)
+                    if self._hash not in seen:
+                        seen.add(self._hash)
+                        turns.append((swap, action))
+                    self.undo()
+
+            self.undo()
+            yield from turns
+
+    def listSwaps(self, unique: bool=False) -> List[Move]:
+        """
+        Returns the legal swaps, see iterSwaps.
         
         Returns:
-            A set of tuples which present the legal swaps for the board. Each
-            tuple contians two positions on the board.
+            A list of swap moves, each appearing once.
+        """
+        if self.move_cache is not None and self.state == State.SWAP:
+            return list(self._cachedMoves(unique))
+        return list(self.iterSwaps(unique))
+
+    def listActions(self, unique: bool=False, maximal: bool=False) -> List[Move]:
         """
-        out = set()
+        Returns the legal actions, the skip action first, see iterActions.
         
+        Returns:
+            A list of action moves.
+        """
+        if self.move_cache is not None and self.state == State.ACTION:
+            return list(self._cachedMoves(unique, maximal))
+        return list(self.iterActions(unique=unique, maximal=maximal))
+
+    def move2str(self, move: Move) -> str:
+        """
+        Converts a move to the format used for input and by the network
+        protocol: the coordinates of the squares involved separated by spaces,
+        the acting piece first. The skip action is the empty string.
+
+        Args:
+            move: The move to convert.
+
+        Returns:
+            The string representation of the move.
+        """
+        return ' '.join(self._cord2str(self.points[i]) for i in move[1:])
+
+    def str2move(self, string: str) -> Move:
+        """
+        Inverse of move2str. Whether the string describes a swap or an action
+        depends on the current state.
+
+        Args:
+            string: The string to parse.
+
+        Returns:
+            The move the string represents, which may still be illegal.
+
+        Raises:
+            InputError: If string is not a well formed move.
+        """
+        cords = [self._str2cord(s) for s in string.split()]
+
+        for c in cords:
+            if not self._inbound(c):
+                raise InputError(f'{self._cord2str(c)} is not on the board')
+
+        squares = [self._index(c) for c in cords]
+
         if self.state == State.SWAP:
-            team = self.team_pieces[self.turn]
+            if len(squares) != 2:
+                raise InputError('A swap needs exactly 2 coordinates')
+            return swapMove(squares[0], squares[1])
 
-            for p in team:
-                out.update(p.listSwaps(self.pieces))
+        if len(squares) == 0:
+            return SKIP
 
-        return out
+        if len(squares) < 2:
+            raise InputError('Need at least 2 cordinates to preform an action')
+
+        return actionMove(squares[0], squares[1:])
 
-    def listActions(self) -> List[Action]:
+    def movePoints(self, move: Move) -> List[Point]:
         """
-        Returns the legal actions. The empty dict represents the skip action.
-        
+        Returns the positions of the squares a move involves.
+        """
+        return [self.points[i] for i in move[1:]]
+
+    def moveIndex(self, move: Move) -> int:
+        """
+        Returns the index of a move in the action space, see actionspace.py.
+        """
+        return self.action_space.index(move)
+
+    def indexMove(self, index: int) -> Move:
+        """
+        Inverse of moveIndex.
+        """
+        return self.action_space.move(index)
+
+    def legalMask(self, unique: bool=False) -> int:
+        """
+        Returns the legal moves as a bitmask over the action space, bit k set
+        if the move with index k is legal. There are none once the game is
+        won. Use geometry.squaresOf to iterate over the set bits.
+
+        Args:
+            unique: Whether to leave out moves leading to the same position
+                        as an earlier one, see iterSwaps and iterActions.
+
         Returns:
-            A list of actions. See piece.py for the definition of an Action.
+            The bitmask of legal moves.
         """
-        out = [{}]
+        if self.won is not None:
+            return 0
 
-        if self.state == State.ACTION:
-            team = self.team_pieces[self.turn]
+        indices = self.action_space.indices
+        mask = 0
 
-            for p in team:
-                out += p.listActions(self.pieces)
+        for move in self.iterMoves(unique=unique):
+            if len(move) > 3:
+                move = (MOVE_ACTION, move[1], *sorted(move[2:]))
+            mask |= 1 << indices[move]
 
-        return out
+        return mask
+
+    def playIndex(self, index: int, notify=None) -> None:
+        """
+        Plays the move with an index in the action space if it is legal.
+
+        Args:
+            index: The index of the move.
+
+        Returns:
+            None
+
+        Raises:
+            InputError: If there is no move with that index.
+            SwapError: If the move is an illegal swap.
+            ActionError: If the move is an illegal action.
+        """
+        move = self.action_space.move(index)
+
+        if not self.isLegal(move):
+            if move[0] == MOVE_SWAP:
+                raise SwapError(f'Swap {index} is not legal')
+            raise ActionError(f'Action {index} is not legal')
+
+        self.playMove(move, notify)
 
 
 class GameManager:
@@ -470,8 +1384,18 @@ class GameManager:
         input_queue: A queue that stores the moves to be played.
     """
 
-    def __init__(self):
-        self.game = Game()
+    def __init__(
+            self,
+            width: int=4,
+            height: int=4,
+            layout: Optional[str]=None,
+            max_repetitions: Optional[int]=None,
+            cache_size: int=0
+            ):
+        self.game = Game(width, height, layout, max_repetitions)
+        # the view and bots looking at the same turn share the moves
+        if cache_size:
+            self.game.move_cache = MoveCache(cache_size)
 
         self.msg_types = ['board', 'turn', 'finished']
         self.subscribers = {msg_type:[] for msg_type in self.msg_types}
@@ -492,6 +1416,9 @@ class GameManager:
     def pieces(self):
         return self.game.pieces
 
+    def pieceAt(self, pos):
+        return self.game.pieceAt(pos)
+
     def resetBoard(self):
         self.game.resetBoard()
 
@@ -539,7 +1466,7 @@ class GameManager:
             raise TypeError(f'{msg_type} not a valid msg_type')
 
         if msg_type == 'board':
-            data = [pos, str(self.game.pieces[pos])]
+            data = [pos, str(self.game.pieceAt(pos))]
         elif msg_type == 'turn':
             data = [str(self.turn()), str(self.state())]
         elif msg_type == 'finished':
@@ -582,6 +1509,18 @@ class GameManager:
     def listActions(self):
         return self.game.listActions()
 
+    def move2str(self, move):
+        return self.game.move2str(move)
+
+    def str2move(self, s):
+        return self.game.str2move(s)
+
+    def movePoints(self, move):
+        return self.game.movePoints(move)
+
+    def playMove(self, move: Move) -> None:
+        self.game.playMove(move, self.notify)
+
     def swap(self, pos1: Point, pos2: Point) -> None:
         self.game.swap(pos1, pos2, self.notify)
 
@@ -598,14 +1537,7 @@ class GameManager:
         while 1:
             logging.debug(self.game)
 
-            if loser := (self.game.isolated() or self.game.kingDead() or self.game.tooManyPasses()):
-                if loser == Colour.BLACK:
-                    self.game.won = Colour.WHITE
-                elif loser == Colour.WHITE:
-                    self.game.won = Colour.BLACK
-                else:
-                    self.game.won = Colour.BOTH
-
+            if self.game.won is not None:
                 logging.debug(f'{self.won} won')
                 self.notify(msg_type='finished')
                 break
@@ -614,51 +1546,26 @@ class GameManager:
 
             if self.state() == State.SWAP:
                 logging.debug(f'{self.game.turn} to swap')
+            else:
+                logging.debug(f'{self.game.turn} to action')
 
-                while 1:
-                    start, end = self.getInput().split()
-                    logging.debug(f'{start} {end}')
+            while 1:
+                in_str = self.getInput()
+                logging.debug(in_str)
 
-                    try:
-                        start_fmt = self.game._str2cord(start) 
-                        end_fmt = self.game._str2cord(end)
-                    except InputError as e:
-                        logging.warning(e)
-                        continue
+                try:
+                    move = self.game.str2move(in_str)
+                except InputError as e:
+                    logging.warning(e)
+                    continue
 
-                    try:
-                        self.swap(start_fmt, end_fmt)
-                        break
-                    except SwapError as e:
-                        logging.warning(e)
+                if not self.game.isLegal(move):
+                    logging.warning(f'Illegal move "{in_str}"')
+                    continue
 
-            else:
-                logging.debug(f'{self.game.turn} to action')
+                self.playMove(move)
+                break
 
-                while 1:
-                    str_cords = self.getInput().split()
-                    logging.debug(str_cords)
-
-                    try:
-                        cords = [self.game._str2cord(s) for s in str_cords]
-                    except InputError as e:
-                        logging.warning(e)
-                        continue
-
-                    if len(cords) == 0:
-                        self.game.skipAction()
-                        break
-
-                    if len(cords) < 2:
-                        logging.warning('Need at least 2 cordinates to preform an action')
-                        continue
-
-                    try:
-                        self.action(cords[0], cords[1:])
-                        break
-                    except ActionError as e:
-                        logging.warning(e)
-    
 
 if __name__ == '__main__':
     g = Game()
@@ -0,0 +1,97 @@
+"""
+Lookup tables describing the shape of a board. They only depend on the
+board dimensions, so they are built once per size and shared by every Game.
+Squares are referred to by their row-major index, see Game._index.
+"""
+
+from functools import lru_cache
+from typing import List, Tuple, Optional, Iterator
+
+Point = Tuple[int, int]
+
+# left, down, right, up; the same order Piece used for its neighbours
+DIRECTIONS: Tuple[Point, ...] = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+
+class Geometry:
+    """
+    Precomputed neighbourhoods and rays for one board size.
+
+    Attributes:
+        WIDTH: The width of the board.
+        HEIGHT: The height of the board.
+        size: The number of squares on the board.
+        points: points[i] is the (x, y) position of square i.
+        neighbours: neighbours[i] are the squares orthogonally next to i.
+        neighbour_masks: neighbour_masks[i] has bit j set if j is next to i.
+        rays: rays[i][d] are the squares from i outwards in DIRECTIONS[d],
+                nearest first, not including i.
+        lines: lines[i] are the squares sharing a row or column with i.
+        between: between[i][j] are the squares strictly between i and j if
+                they share a row or column, else None.
+        mirrors: mirrors[i] is the square i maps to when the board is
+                mirrored left to right.
+        flips: flips[i] is the square i maps to when the board is flipped
+                top to bottom.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.WIDTH: int = width
+        self.HEIGHT: int = height
+        self.size: int = width*height
+
+        self.points: List[Point] = [(i % width, i // width) for i in range(self.size)]
+
+        self.rays: List[Tuple[Tuple[int, ...], ...]] = [
+                tuple(self._ray(p, d) for d in DIRECTIONS) for p in self.points]
+
+        self.neighbours: List[Tuple[int, ...]] = [
+                tuple(ray[0] for ray in rays if ray) for rays in self.rays]
+
+        self.neighbour_masks: List[int] = [
+                sum(1 << j for j in n) for n in self.neighbours]
+
+        self.lines: List[Tuple[int, ...]] = [
+                tuple(j for ray in rays for j in ray) for rays in self.rays]
+
+        self.between: List[List[Optional[Tuple[int, ...]]]] = [
+                [None] * self.size for _ in range(self.size)]
+
+        for i, rays in enumerate(self.rays):
+            for ray in rays:
+                for k, j in enumerate(ray):
+                    self.between[i][j] = ray[:k]
+
+        self.mirrors: Tuple[int, ...] = tuple(
+                width - 1 - x + y*width for x, y in self.points)
+
+        self.flips: Tuple[int, ...] = tuple(
+                x + (height - 1 - y)*width for x, y in self.points)
+
+    def _ray(self, start: Point, direction: Point) -> Tuple[int, ...]:
+        out = []
+        x, y = start[0] + direction[0], start[1] + direction[1]
+
+        while 0 <= x < self.WIDTH and 0 <= y < self.HEIGHT:
+            out.append(x + y*self.WIDTH)
+            x, y = x + direction[0], y + direction[1]
+
+        return tuple(out)
+
+
+@lru_cache(maxsize=None)
+def boardGeometry(width: int, height: int) -> Geometry:
+    """
+    Returns the shared tables for a width by height board.
+    """
+    return Geometry(width, height)
+
+
+def squaresOf(mask: int) -> Iterator[int]:
+    """
+    Yields the index of every set bit of a square bitmask, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
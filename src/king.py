@@ -1,34 +1,14 @@
-from piece import Piece, Pieces, Point, Action
+from piece import Piece, Point, registerPiece
 from colour import Colour
-from typing import List
-from exceptions import ActionError
+from cell import KING
 
+@registerPiece
 class King(Piece):
 
-    def __init__(self, colour: Colour, pos: Point, hp: int=4):
-        super().__init__(4, hp, False, colour, pos, False, True)
+    KIND = KING
+
+    def __init__(self, colour: Colour, pos: Point, hp: int=4, active: bool=False):
+        super().__init__(colour, pos, hp, active)
 
     def __str__(self):
         return 'K ' + super().__str__()
-
-    def canAction(self, targets: List['Piece'], pieces: Pieces) -> bool:
-        return (len(targets) == 1
-                and self._active
-                and self._colour != targets[0]._colour
-                and targets[0]._hp > 0
-                and self.distance(targets[0]) == 1)
-
-    def applyAction(self, targets: List['Piece'], pieces: Pieces) -> None:
-        if not self.canAction(targets, pieces):
-            raise ActionError('can\'t apply action')
-        
-        targets[0].takeDmg()
-
-    def listActions(self, pieces: Pieces) -> List[Action]:
-        if not self._active:
-            return []
-
-        indices = self.neighbourPositions()
-
-        return [ {self:[pieces[i]]} for i in indices if self.canAction([pieces[i]], pieces) ]
-
@@ -0,0 +1,18 @@
+"""
+Starting layouts, keyed by the (width, height) of the board. Each layout is a
+board in the format of Game.toText: one row per '/' from the top, a letter per
+piece (upper case black, lower case white) followed by its hp, '.' for an
+empty square. Pieces can only move by swapping with other pieces, so every
+layout fills the board.
+"""
+
+from typing import Dict, Tuple
+
+LAYOUTS: Dict[Tuple[int, int], str] = {
+    # the original board, black's shield starts a point down to make up for
+    # black moving first
+    (4, 4): 'A3K4M3A3/N3S3W3N3/n3s4w3n3/a3k4m3a3',
+    (6, 6): 'A3N3K4M3N3A3/N3S4W3A3S4N3/A3N3S4S4N3A3/a3n3s4s4n3a3/n3s4w3a3s4n3/a3n3k4m3n3a3',
+    (8, 8): ('A3N3M3K4A3M3N3A3/N3A3S4W3N3S4A3N3/A3N3N3S4A3N3N3A3/N3S4A3N3S4A3S4N3/'
+             'n3s4a3n3s4a3s4n3/a3n3n3s4a3n3n3a3/n3a3s4w3n3s4a3n3/a3n3m3k4a3m3n3a3'),
+}
@@ -1,8 +1,8 @@
 from game import Game, State
 from bot import Bot
 from math import sqrt, log
+from time import perf_counter
 import random
-import copy
 import sys
 
 #tmp
@@ -11,13 +11,14 @@ from colour import Colour
 
 class Node:
 
-    def __init__(self, state, parent, data=None):
+    def __init__(self, parent, snapshot, data=None):
         self.visits = 0
         self.wins = 0
-        self.state = state
+        # shares every unchanged square with the parent's snapshot
+        self.snapshot = snapshot
         self.parent = parent
         self.children = []
-        self.data = copy.deepcopy(data)
+        self.data = data
 
     def __str__(self):
         return f'{self.visits=}, {self.wins=}, {self.data=}'
@@ -32,26 +33,66 @@ class Node:
 
 class MCTSBot(Bot):
 
+    # the repetition rule playouts use if the game has none
+    PLAYOUT_REPETITIONS = 3
+    # playouts that last longer are not scored
+    PLAYOUT_MOVES = 50
+    # without a time limit, the simulations to run, at least
+    # CHILD_SIMULATIONS per move of the root
+    SIMULATIONS = 1000
+    CHILD_SIMULATIONS = 4
+
+    def __init__(self, game_manager, team, macro=False, cache_size=0, batch_size=0, maximal=False):
+        super().__init__(game_manager, team, macro, cache_size, maximal)
+        # the number of playouts to run at once per simulation with the
+        # NumPy batch engine, 0 to play a single one with Game
+        self.batch_size = batch_size
+
     def chooseMove(self, time=None):
         self.sims = 0
-        n_simulations = 1000
-        root = Node(self.manager.game, None)
+        # every simulation restores a node's snapshot into this copy
+        game = self.searchGame()
+        # playouts that go round in circles end in a draw
+        if game.max_repetitions is None:
+            game.max_repetitions = self.PLAYOUT_REPETITIONS
+        root = Node(None, game.snapshot())
+        self.expandNode(game, root)
+
+        if time is None:
+            n_simulations = max(self.SIMULATIONS, self.CHILD_SIMULATIONS * len(root.children))
+            deadline = None
+        else:
+            n_simulations = sys.maxsize
+            deadline = perf_counter() + time
 
         for _ in range(n_simulations):
+            if deadline is not None and perf_counter() >= deadline:
+                break
             if self.sims % 100 == 0:
                 print(self.sims)
             self.sims += 1
             promising_node = self.selectPromisingNode(root)
+            game.restore(promising_node.snapshot)
 
-            if promising_node.state.won == None:
-                self.expandNode(promising_node)
+            if promising_node.snapshot.won == None:
+                self.expandNode(game, promising_node)
 
-            node_to_explore = promising_node if not promising_node.children else promising_node.randomChild()
+            if promising_node.children:
+                node_to_explore = promising_node.randomChild()
+                self.play(game, node_to_explore.data)
+            else:
+                node_to_explore = promising_node
 
-            playout_res = self.simulatePlayout(node_to_explore)
-            self.backprop(node_to_explore, playout_res)
+            if self.batch_size:
+                for playout_res in self.simulateBatch(game):
+                    self.backprop(node_to_explore, playout_res)
+            else:
+                playout_res = self.simulatePlayout(game)
+                self.backprop(node_to_explore, playout_res)
 
-        choice = max(root.children, key=lambda n : n.wins / n.visits)
+        # the most visited move, a win rate means little for moves visited
+        # rarely or never
+        choice = max(root.children, key=lambda n : n.visits)
         print(choice)
 
         return choice.data
@@ -61,67 +102,67 @@ class MCTSBot(Bot):
             node = max(node.children, key=lambda n : n.uct(self.sims))
         return node
 
-    def expandNode(self, node):
-        if node.state.state == State.SWAP:
-            swaps = list(node.state.listSwaps())
-
-            for swap in swaps:
-                g = copy.deepcopy(node.state)
-                g.swap(swap[0]._pos, swap[1]._pos)
-                node.children.append(Node(g, node, swap))
+    def expandNode(self, game, node):
+        # one child per distinct resulting position
+        if self.macro:
+            moves = list(game.iterTurns(maximal=self.maximal))
+        elif game.state == State.SWAP:
+            moves = game.listSwaps(unique=True)
         else:
-            actions = node.state.listActions()
-
-            for action in actions:
-                g = copy.deepcopy(node.state)
-                
-                if action:
-                    p = list(action.keys())[0]
-                    g.action(p._pos, [x._pos for x in action[p]])
-                else:
-                    g.skipAction()
-                node.children.append(Node(g, node, action))
-
-    def simulatePlayout(self, node):
-        tmp_state = copy.deepcopy(node.state)
+            moves = game.listActions(unique=True, maximal=self.maximal)
+
+        for move in moves:
+            self.play(game, move)
+            node.children.append(Node(node, game.snapshot(node.snapshot), move))
+            self.unplay(game, move)
+
+    def simulatePlayout(self, game):
         i = 0
-        max_iters = 50
+        max_iters = self.PLAYOUT_MOVES
 
-        while tmp_state.won == None and i < max_iters:
+        while game.won == None and i < max_iters:
             i += 1
-            if tmp_state.state == State.SWAP:
-                swaps = list(tmp_state.listSwaps())
+            if game.state == State.SWAP:
+                swaps = game.listSwaps()
                 try:
                     swap = random.choice(swaps)
                 except Exception as e:
                     print(e)
-                    print(tmp_state.state, tmp_state.turn)
-                    print(tmp_state)
+                    print(game.state, game.turn)
+                    print(game)
                     print(swaps)
                     sys.exit(1)
-                tmp_state.swap(swap[0]._pos, swap[1]._pos)
+                game.playMove(swap)
 
             else:
-                actions = tmp_state.listActions()
+                actions = game.listActions()
                 try:
                     action = random.choice(actions)
                 except:
-                    print(tmp_state.state, tmp_state.turn)
-                    print(tmp_state)
+                    print(game.state, game.turn)
+                    print(game)
                     print(actions)
                     sys.exit(1)
 
-                if action:
-                    p = list(action.keys())[0]
-                    tmp_state.action(p._pos, [x._pos for x in action[p]])
-                else:
-                    tmp_state.skipAction()
+                game.playMove(action)
+
+        return game.won
+
+    def simulateBatch(self, game):
+        # imported here so NumPy is only needed when batches are used
+        from batch import BatchGame
 
-        return tmp_state.won
+        batch = BatchGame.fromGames([game] * self.batch_size)
+        batch.playout(self.PLAYOUT_MOVES)
+        return batch.winners()
 
     def backprop(self, node, winner):
         while node:
             node.visits += 1
-            if (node.state.state == State.SWAP and node.state.turn != winner) or (node.state.state == State.ACTION and node.state.turn == winner):
+            state, turn = node.snapshot.state, node.snapshot.turn
+            # playouts cut off at PLAYOUT_MOVES count as draws
+            if winner == Colour.BOTH or winner is None:
+                node.wins += 0.5
+            elif (state == State.SWAP and turn != winner) or (state == State.ACTION and turn == winner):
                 node.wins += 1
             node = node.parent
@@ -0,0 +1,29 @@
+"""
+Moves are plain tuples of square indices (see Game._index) tagged with their
+kind, so they are cheap to create, hash, compare and copy:
+
+    (MOVE_SWAP, i, j)               swap the squares i < j
+    (MOVE_ACTION, src, t1, ...)     the piece on src acts on the targets
+    (MOVE_SKIP,)                    skip the action
+
+A turn is the tuple of moves one player makes before the other plays, a swap
+and an action, or only the swap if it ended the game.
+"""
+
+from typing import Tuple, Iterable
+
+MOVE_SWAP = 0
+MOVE_ACTION = 1
+MOVE_SKIP = 2
+
+Move = Tuple[int, ...]
+Turn = Tuple[Move, ...]
+
+SKIP: Move = (MOVE_SKIP,)
+
+
+def swapMove(i: int, j: int) -> Move:
+    return (MOVE_SWAP, i, j) if i < j else (MOVE_SWAP, j, i)
+
+def actionMove(src: int, targets: Iterable[int]) -> Move:
+    return (MOVE_ACTION, src, *targets)
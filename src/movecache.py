@@ -0,0 +1,75 @@
+"""
+A bounded cache of legal move lists, see Game.move_cache. Positions are
+keyed by their Zobrist hash, which covers the board, turn, state and passes,
+so a position reached again, in a search or by another caller on the same
+turn, skips move generation.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+from move import Move
+
+
+class MoveCache:
+    """
+    Legal move lists by position, evicting the least recently used once
+    capacity is reached.
+
+    Attributes:
+        capacity: The maximum number of positions kept.
+        hits: The number of lookups that found their position.
+        misses: The number of lookups that had to generate the moves.
+    """
+
+    def __init__(self, capacity: int=4096):
+        if capacity < 1:
+            raise ValueError('A move cache needs room for at least one position')
+
+        self.capacity: int = capacity
+        self.hits: int = 0
+        self.misses: int = 0
+        self._moves: OrderedDict = OrderedDict()
+
+    def __len__(self):
+        return len(self._moves)
+
+    def get(self, key: Hashable, generate: Callable[[], Tuple[Move, ...]]) -> Tuple[Move, ...]:
+        """
+        Returns the moves cached under key, calling generate to fill the
+        entry on a miss.
+
+        Args:
+            key: The position, and whatever else the moves depend on.
+            generate: Returns the moves of the position.
+
+        Returns:
+            The moves of the position.
+        """
+        moves = self._moves.get(key)
+
+        if moves is None:
+            self.misses += 1
+            moves = self._moves[key] = generate()
+            if len(self._moves) > self.capacity:
+                self._moves.popitem(last=False)
+        else:
+            self.hits += 1
+            self._moves.move_to_end(key)
+
+        return moves
+
+    def hitRate(self) -> float:
+        """
+        Returns the share of lookups that were hits, 0 before any lookup.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def clear(self) -> None:
+        """
+        Forgets every position and resets the counters.
+        """
+        self._moves.clear()
+        self.hits = 0
+        self.misses = 0
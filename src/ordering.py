@@ -0,0 +1,184 @@
+"""
+The order a game tree search visits the moves of a position in. Alpha-beta
+prunes the most when the best move comes first, so AlphaBetaBot hands the
+moves of every node to a MoveOrdering, which can be swapped for another.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from move import Move, MOVE_SWAP, MOVE_ACTION, MOVE_SKIP
+from cell import KING, MEDIC, WIZARD, KIND_MASK, HP_MASK, HP_SHIFT, TEAM
+
+# how much hitting a piece is worth when ordering captures, indexed by kind
+CAPTURE_VALUES = (0, 3, 10, 3, 3, 2, 3)
+# a hit that kills the king ends the game
+KING_KILL = 100
+
+# the tiers of HeuristicOrdering, compared before the scores within a tier
+_SKIP, _QUIET, _KILLER, _CAPTURE = range(4)
+
+
+def captureValue(game, move) -> int:
+    """
+    Returns how much the attack of a move or turn is worth, 0 if it
+    attacks nothing. Each hit is worth the value of the piece hit,
+    doubled if it kills it.
+
+    Args:
+        game: The game in the position the move is played from.
+        move: The move, or turn, see move.py.
+
+    Returns:
+        The value of the attack.
+    """
+    steps = move if isinstance(move[0], tuple) else (move,)
+    action = steps[-1]
+    if action[0] != MOVE_ACTION:
+        return 0
+
+    cells = game.cells
+    swap: Optional[Move] = steps[0] if steps[0][0] == MOVE_SWAP else None
+
+    def cellAt(i):
+        # the cells the action sees, after the swap of the turn
+        if swap is not None:
+            if i == swap[1]:
+                i = swap[2]
+            elif i == swap[2]:
+                i = swap[1]
+        return cells[i]
+
+    src = cellAt(action[1])
+    kind = src & KIND_MASK
+    if kind == MEDIC or kind == WIZARD:
+        return 0
+
+    value = 0
+    for t in action[2:]:
+        c = cellAt(t)
+        if TEAM[c] == 0 or TEAM[c] == TEAM[src]:
+            continue
+        hit = c & KIND_MASK
+        if (c & HP_MASK) >> HP_SHIFT == 1:
+            value += KING_KILL if hit == KING else 2 * CAPTURE_VALUES[hit]
+        else:
+            value += CAPTURE_VALUES[hit]
+
+    return value
+
+
+class MoveOrdering:
+    """
+    Leaves the moves in the order the game generates them. Subclasses
+    reorder them using what the search tells them about cutoffs.
+
+    The moves are single moves, or whole turns if the search is over turns
+    (see Game.iterTurns).
+    """
+
+    def newSearch(self) -> None:
+        """
+        Called before each search of a position.
+        """
+
+    def order(self, game, moves: Iterable, ply: int) -> Iterable:
+        """
+        Puts the moves of a position in the order to search them in.
+
+        Args:
+            game: The game in the position searched.
+            moves: The legal moves of the position, skip last.
+            ply: How many moves deep into the search the position is.
+
+        Returns:
+            The same moves, in order.
+        """
+        return moves
+
+    def cutoff(self, game, move, ply: int, depth: int) -> None:
+        """
+        Called when a move caused a cutoff, once it is undone.
+
+        Args:
+            game: The game in the position searched.
+            move: The move that was too good for the other player to allow.
+            ply: How many moves deep into the search the position is.
+            depth: The depth the position was searched to.
+
+        Returns:
+            None
+        """
+
+
+class HeuristicOrdering(MoveOrdering):
+    """
+    Orders captures first, the most valuable hits first, then the killer
+    moves of the ply, then the other moves by their history score, and the
+    skip action last.
+
+    Attributes:
+        killers: killers[ply] holds the last KILLERS quiet moves that caused
+                    a cutoff at ply, the latest first.
+        history: Maps the key of a quiet move (see historyKey) to the sum of
+                    depth * depth over the cutoffs it caused.
+    """
+
+    KILLERS = 2
+
+    def __init__(self):
+        self.killers: Dict[int, List] = {}
+        self.history: Dict[Hashable, int] = {}
+
+    def newSearch(self) -> None:
+        """
+        Forgets the killers, which belong to the previous position, and
+        halves the history so recent cutoffs weigh more.
+        """
+        self.killers.clear()
+        self.history = {key: score // 2 for key, score in self.history.items() if score > 1}
+
+    def order(self, game, moves: Iterable, ply: int) -> List:
+        killers = self.killers.get(ply, ())
+        history = self.history
+        scored = []
+
+        for k, move in enumerate(moves):
+            steps = move if isinstance(move[0], tuple) else (move,)
+            last = steps[-1]
+            if last[0] == MOVE_SKIP:
+                score = (_SKIP, 0)
+            else:
+                capture = captureValue(game, move)
+                if capture:
+                    score = (_CAPTURE, capture)
+                elif move in killers:
+                    score = (_KILLER, -killers.index(move))
+                else:
+                    score = (_QUIET, sum(history.get(self.historyKey(game, m), 0) for m in steps))
+            # ties keep the order the moves were generated in
+            scored.append((score, -k, move))
+
+        scored.sort(reverse=True)
+
+        return [move for _, _, move in scored]
+
+    def cutoff(self, game, move, ply: int, depth: int) -> None:
+        steps = move if isinstance(move[0], tuple) else (move,)
+        if steps[-1][0] == MOVE_SKIP or captureValue(game, move):
+            return
+
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.KILLERS:]
+
+        for m in steps:
+            key = self.historyKey(game, m)
+            self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def historyKey(self, game, move: Move) -> Hashable:
+        """
+        Returns the kind of the piece making move, the square it moves or
+        acts from and where it moves or what it acts on.
+        """
+        return (game.cells[move[1]] & KIND_MASK, *move[1:])
@@ -1,14 +1,16 @@
-from abc import ABC, abstractmethod
-from typing import Type, Optional, Tuple, Dict, List, Set
-from exceptions import SwapError
+from typing import Type, Optional, Tuple, Dict, List
 from colour import Colour
+from cell import (EMPTY, MAX_HP, BLOCKS, SWAPABLE, MAX_TRGTS, KIND_MASK,
+        cellHp, cellActive, cellColour)
 
 Point = Tuple[int, int]
 Pieces = Dict[Point, 'Piece']
-Action = Dict['Piece', List['Piece']] 
-class Piece(ABC):
+
+class Piece:
     '''
-    An abstract base class for a Feud Piece. Implements swapping functionality.
+    A read-only view of one square of the board. The rules run directly on
+    the packed cells stored in Game (see cell.py and rules.py), pieces only
+    exist to describe a layout and to let the GUI inspect the board.
 
     Attributes:
     _max_hp: The maximum number of hit points the piece can have.
@@ -21,97 +23,48 @@ class Piece(ABC):
     _max_trgts: The maximum number of pieces that can be targeted with an action.
     '''
 
-    x_dir = [-1, 0, 1, 0]
-    y_dir = [0, 1, 0, -1] 
+    KIND = EMPTY
 
     def __init__(
             self,
-            max_hp: int,
-            hp: int,
-            active: bool,
-            colour: Colour,
+            colour: Optional[Colour],
             pos: Point,
-            blocks: bool,
-            swapable: bool,
-            max_trgts: int = 1
+            hp: int,
+            active: bool = False
             ):
-        self._max_hp: int = max_hp
+        alive = hp > 0
+
+        self._max_hp: int = MAX_HP[self.KIND]
         self._hp: int = min(hp, self._max_hp)
-        self._active: bool = active
-        self._colour: Optional[Colour] = colour
+        self._active: bool = active and alive
+        self._colour: Optional[Colour] = colour if alive else None
         self._pos: Point = pos
-        self._blocks: bool = blocks
-        self._swapable: bool = swapable
-        self._max_trgts: int = max_trgts
+        self._blocks: bool = BLOCKS[self.KIND] and alive
+        self._swapable: bool = SWAPABLE[self.KIND] and alive
+        self._max_trgts: int = MAX_TRGTS[self.KIND]
 
     def __str__(self):
         return f'{self._colour} {self._hp} {self._max_hp} {self._active}'
 
-    def neighbourPositions(self, boardWidth: int=4) -> List[Point]:
-        return [ (x, y) for i in range(len(self.x_dir)) if 0 <= (x := self._pos[0]+self.x_dir[i]) < boardWidth and 0 <= (y := self._pos[1]+self.y_dir[i]) < boardWidth ]
-
-    def distance(self, piece: 'Piece') -> int:
-        return abs(self._pos[0]-piece._pos[0]) + abs(self._pos[1]-piece._pos[1])
-
-    def index(self, boardWidth: int=4) -> int:
-        return self._pos[0] + self._pos[1]*boardWidth
-
-    def takeDmg(self) -> None:
-        self._hp -= 1
-
-        if self._hp <= 0:
-            self._active = False
-            self._swapable = False
-            self._blocks = False
-            self._colour = None
-
-    def heal(self) -> None:
-        self._hp = min(self._max_hp, self._hp + 1)
-
-    def updateActivity(self, pieces: Pieces) -> None:
-        if self._hp > 0:
-            for i in self.neighbourPositions():
-                if self._colour == pieces[i]._colour:
-                    self._active = True
-                    return
-
-        self._active = False
-
-    def canSwap(self, piece: 'Piece') -> bool: 
-        return ((self._colour == piece._colour or piece._swapable)
-                and self._active
-                and self.distance(piece) == 1)
-
-    def applySwap(self, piece: 'Piece') -> None:
-        #if not self.canSwap(piece):
-            #raise SwapError(f'{self} and {piece} are not swapable')
-        self._pos, piece._pos = piece._pos, self._pos
-
-    def listSwaps(self, pieces: Pieces) -> Set[Tuple['Piece', 'Piece']]:
-        if not self._active:
-            return set()
-
-        indices = self.neighbourPositions()
-        out = set()
-
-        for i in indices:
-            if self.canSwap(pieces[i]):
-                p1, p2 = self, pieces[i]
-                if self.index() > pieces[i].index():
-                    p1, p2 = pieces[i], self
-                out.add((p1, p2))
+    @staticmethod
+    def fromCell(cell: int, pos: Point) -> 'Piece':
+        """
+        Creates a view of a packed cell.
 
-        return out
+        Args:
+            cell: The packed cell, see cell.py.
+            pos: The position of the cell on the board.
 
-    @abstractmethod
-    def canAction(self, targets: List['Piece'], pieces: Pieces) -> bool:
-        pass
+        Returns:
+            A piece of the kind stored in the cell.
+        """
+        cls = PIECE_TYPES[cell & KIND_MASK]
+        return cls(cellColour(cell), pos, cellHp(cell), cellActive(cell))
 
-    @abstractmethod
-    def applyAction(self, targets: List['Piece'], pieces: Pieces) -> None:
-        pass
 
-    @abstractmethod
-    def listActions(self, pieces: Pieces) -> List[Action]:
-        pass
+# filled in by the piece modules, indexed by kind
+PIECE_TYPES: List[Type[Piece]] = [Piece] * len(MAX_HP)
 
+def registerPiece(cls: Type[Piece]) -> Type[Piece]:
+    PIECE_TYPES[cls.KIND] = cls
+    return cls
@@ -0,0 +1,238 @@
+"""
+The action rules of every kind of piece, written against the packed cells of
+a Game (see cell.py). Squares are referred to by their index into game.cells.
+"""
+
+from itertools import combinations
+from typing import Iterator, Tuple, Callable
+
+from cell import (EMPTY, MEDIC, SHIELD, WIZARD, KIND_MASK, HP_MASK,
+        HP_SHIFT, ACTIVE_BIT, MAX_HP, MAX_TRGTS, TEAM)
+from geometry import squaresOf
+
+Targets = Tuple[int, ...]
+
+
+def _isEnemy(mine: int, other: int) -> bool:
+    team = TEAM[other]
+    return team != 0 and team != TEAM[mine]
+
+def _isAlly(mine: int, other: int) -> bool:
+    return TEAM[other] == TEAM[mine]
+
+def _noTarget(game, src: int, trgt: int) -> bool:
+    return False
+
+def _archerCanTarget(game, src: int, trgt: int) -> bool:
+    cells = game.cells
+    mine = cells[src]
+
+    between = game.geometry.between[src][trgt]
+
+    if between is None or not _isEnemy(mine, cells[trgt]):
+        return False
+
+    # enemy shields block arrows
+    for i in between:
+        c = cells[i]
+        if c & KIND_MASK == SHIELD and _isEnemy(mine, c):
+            return False
+
+    return True
+
+def _adjacentEnemy(game, src: int, trgt: int) -> bool:
+    cells = game.cells
+    return game.geometry.neighbour_masks[src] >> trgt & 1 and _isEnemy(cells[src], cells[trgt])
+
+def _medicCanTarget(game, src: int, trgt: int) -> bool:
+    cells = game.cells
+    c = cells[trgt]
+    return (game.geometry.neighbour_masks[src] >> trgt & 1
+            and _isAlly(cells[src], c)
+            and (c & HP_MASK) >> HP_SHIFT < MAX_HP[c & KIND_MASK])
+
+def _wizardCanTarget(game, src: int, trgt: int) -> bool:
+    cells = game.cells
+    return _isAlly(cells[src], cells[trgt])
+
+# indexed by kind
+_CAN_TARGET: Tuple[Callable, ...] = (
+        _noTarget, _archerCanTarget, _adjacentEnemy, _adjacentEnemy,
+        _medicCanTarget, _noTarget, _wizardCanTarget)
+
+
+def _archerTargets(game, src: int) -> Iterator[int]:
+    cells = game.cells
+    mine = cells[src]
+
+    # one outward scan per direction, arrows stop at the first enemy shield
+    for ray in game.geometry.rays[src]:
+        for i in ray:
+            c = cells[i]
+            if _isEnemy(mine, c):
+                yield i
+                if c & KIND_MASK == SHIELD:
+                    break
+
+def _wizardTargets(game, src: int) -> Iterator[int]:
+    roster = game.rosters[TEAM[game.cells[src]] - 1] & ~(1 << src)
+    return squaresOf(roster)
+
+def _neighbourTargets(game, src: int) -> Iterator[int]:
+    can_target = _CAN_TARGET[game.cells[src] & KIND_MASK]
+    return (t for t in game.neighbours[src] if can_target(game, src, t))
+
+def _noTargets(game, src: int) -> Iterator[int]:
+    return iter(())
+
+# indexed by kind
+_TARGETS: Tuple[Callable, ...] = (
+        _noTargets, _archerTargets, _neighbourTargets, _neighbourTargets,
+        _neighbourTargets, _noTargets, _wizardTargets)
+
+
+def iterTargets(game, src: int) -> Iterator[int]:
+    """
+    Yields every square the piece at src could target on its own.
+
+    Args:
+        game: The game the piece belongs to.
+        src: The index of the piece.
+
+    Returns:
+        An iterator over the indices of the squares that can be targeted.
+    """
+    return _TARGETS[game.cells[src] & KIND_MASK](game, src)
+
+def canAction(game, src: int, targets: Targets) -> bool:
+    """
+    Checks if the piece at src can perform an action on targets.
+
+    Args:
+        game: The game the piece belongs to.
+        src: The index of the piece performing the action.
+        targets: The indices of the targeted squares.
+
+    Returns:
+        True if the action is legal, else False.
+    """
+    cell = game.cells[src]
+    kind = cell & KIND_MASK
+
+    if (not cell & ACTIVE_BIT
+            or not 1 <= len(targets) <= MAX_TRGTS[kind]
+            or len(set(targets)) != len(targets)):
+        return False
+
+    can_target = _CAN_TARGET[kind]
+
+    return all(can_target(game, src, t) for t in targets)
+
+def iterActions(game, src: int, maximal: bool=False) -> Iterator[Targets]:
+    """
+    Yields the legal actions of the piece at src, single target actions
+    first.
+
+    Knights and medics may act on any number of their targets up to their
+    limit. Every hit deals one damage and every heal restores one hp,
+    whatever else the action targets, so acting on more targets is usually
+    better for the player acting. With maximal, actions whose targets are a
+    strict subset of those of another action of the piece are left out: a
+    medic heals every neighbour it can and a knight hits as many enemies as
+    it can. This is a heuristic, not a sound pruning: a kill also removes a
+    piece the player could have swapped with and leaves a square no piece
+    can ever swap into, which can leave the player worse off. dominance.py
+    measures how often that happens in play.
+
+    Args:
+        game: The game the piece belongs to.
+        src: The index of the piece.
+        maximal: Whether to leave out the actions on fewer targets.
+
+    Returns:
+        An iterator over target tuples, one per legal action.
+    """
+    cell = game.cells[src]
+
+    if not cell & ACTIVE_BIT:
+        return
+
+    max_trgts = MAX_TRGTS[cell & KIND_MASK]
+
+    if max_trgts == 1:
+        for t in iterTargets(game, src):
+            yield (t,)
+        return
+
+    targets = tuple(iterTargets(game, src))
+    if not targets:
+        return
+    most = min(max_trgts, len(targets))
+
+    for k in range(most if maximal else 1, most + 1):
+        yield from combinations(targets, k)
+
+def actionOutcome(game, src: int, targets: Targets) -> Tuple[int, ...]:
+    """
+    Describes the effect of a legal action, such that two actions of the
+    same player lead to the same position exactly when their outcomes are
+    equal. Every attack deals one damage, so attacks on the same squares are
+    interchangeable whoever makes them, and so are heals. A teleport only
+    depends on the two squares, unless the pieces are identical and it
+    changes nothing.
+
+    Args:
+        game: The game the piece belongs to.
+        src: The index of the piece performing the action.
+        targets: The indices of the targeted squares.
+
+    Returns:
+        A hashable description of the resulting position.
+    """
+    cells = game.cells
+    kind = cells[src] & KIND_MASK
+
+    if kind == WIZARD:
+        trgt = targets[0]
+        if not (cells[src] ^ cells[trgt]) & ~ACTIVE_BIT:
+            return (WIZARD,)
+        return (WIZARD, min(src, trgt), max(src, trgt))
+
+    if kind != MEDIC:
+        # all attacks look alike
+        kind = EMPTY
+
+    return (kind, *sorted(targets))
+
+def applyAction(game, src: int, targets: Targets) -> None:
+    """
+    Applies the effect of an action to the cells of game. Activity flags are
+    left for the caller to update.
+
+    Args:
+        game: The game the piece belongs to.
+        src: The index of the piece performing the action.
+        targets: The indices of the targeted squares.
+
+    Returns:
+        None
+    """
+    cells = game.cells
+    cell = cells[src]
+    kind = cell & KIND_MASK
+
+    if kind == WIZARD:
+        trgt = targets[0]
+        game.setCell(src, cells[trgt])
+        game.setCell(trgt, cell)
+    elif kind == MEDIC:
+        for t in targets:
+            c = cells[t]
+            if (c & HP_MASK) >> HP_SHIFT < MAX_HP[c & KIND_MASK]:
+                game.setCell(t, c + (1 << HP_SHIFT))
+    else:
+        for t in targets:
+            c = cells[t]
+            hp = ((c & HP_MASK) >> HP_SHIFT) - 1
+            # a dead piece keeps only its kind
+            game.setCell(t, c - (1 << HP_SHIFT) if hp > 0 else c & KIND_MASK)
@@ -2,19 +2,18 @@ import logging
 import socket
 import packet
 from game import Game, State
-from exceptions import SwapError, ActionError
 
 
 class GameServer:
     '''
     Server to sync clients game instances.
     '''
-    def __init__(self, ip='localhost', port=60555):
+    def __init__(self, ip='localhost', port=60555, width=4, height=4):
         self.NUM_PLAYERS = 2
         self.IP = ip
         self.PORT = port
 
-        self.game = Game()
+        self.game = Game(width, height)
 
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.bind((self.IP, self.PORT))
@@ -30,7 +29,8 @@ class GameServer:
 
         for i in range(self.NUM_PLAYERS):
             conn, addr = self.socket.accept()
-            self.goodCommand(conn, packet.CONNECTED_CMD, f'{i}')
+            # clients set up a board of the same dimensions
+            self.goodCommand(conn, packet.CONNECTED_CMD, f'{i} {self.game.WIDTH} {self.game.HEIGHT}')
 
             logging.debug(f'Player connected from {addr}')
             self.players.append(conn)
@@ -83,48 +83,28 @@ class GameServer:
             p.close()
 
     def swap_cmd(self, player, msg):
-        args = msg.split()
-
-        try:
-            if self.game.state != State.SWAP or len(args) != 2:
-                raise RuntimeError('Wrong state')
-
-            pos1 = self.game._str2cord(args[0])
-            pos2 = self.game._str2cord(args[1])
-        except:
-            logging.warning(f'{packet.ERROR_CMD} {packet.SEPERATOR} Bad command "{player_input}"')
-            self.badCommand(player, packet.ERROR_CMD, f'Bad command')
-            return False
-
-        try:
-            self.game.swap(pos1, pos2)
-        except SwapError as e:
-            self.badCommand(player, packet.ERROR_CMD, str(e))
-            return False
-
-        return True
+        return self.move_cmd(player, msg, State.SWAP)
 
     def action_cmd(self, player, msg):
-        args = msg.split()
+        return self.move_cmd(player, msg, State.ACTION)
 
+    def move_cmd(self, player, msg, state):
         try:
-            if self.game.state != State.ACTION:
+            if self.game.state != state:
                 raise RuntimeError('Wrong state')
 
-            if len(args) == 0:
-                self.game.skipAction()
-            else:
-                poses = [self.game._str2cord(p) for p in args]
-                try:
-                    self.game.action(poses[0], poses[1:])
-                except ActionError as e:
-                    self.badCommand(player, packet.ERROR_CMD, str(e))
-                    return False
+            move = self.game.str2move(msg)
         except Exception as e:
-            logging.warning(f'{packet.ERROR_CMD} {packet.SEPERATOR} Bad command "{player_input}"')
+            logging.warning(f'{packet.ERROR_CMD} {packet.SEPERATOR} Bad command "{msg}"')
             self.badCommand(player, packet.ERROR_CMD, f'Bad command')
             return False
 
+        if not self.game.isLegal(move):
+            self.badCommand(player, packet.ERROR_CMD, f'Illegal move "{msg}"')
+            return False
+
+        self.game.playMove(move)
+
         return True
 
     def recv(self, conn):
@@ -1,21 +1,14 @@
-from piece import Piece, Pieces, Point, Action
-from typing import List
+from piece import Piece, Point, registerPiece
 from colour import Colour
-from exceptions import ActionError
+from cell import SHIELD
 
+@registerPiece
 class Shield(Piece):
 
-    def __init__(self, colour: Colour, pos: Point, hp: int=4):
-        super().__init__(4, hp, False, colour, pos, True, False)
+    KIND = SHIELD
+
+    def __init__(self, colour: Colour, pos: Point, hp: int=4, active: bool=False):
+        super().__init__(colour, pos, hp, active)
 
     def __str__(self):
         return 'S ' + super().__str__()
-
-    def canAction(self, targets: List['Piece'], pieces: Pieces) -> bool:
-        return False
-
-    def applyAction(self, targets: List['Piece'], pieces: Pieces) -> None:
-        raise ActionError('Shield cannot perform an action')
-
-    def listActions(self, pieces: Pieces) -> List[Action]:
-        return []
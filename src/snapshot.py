@@ -0,0 +1,74 @@
+from typing import Optional, Tuple
+
+from colour import Colour
+
+
+class Snapshot:
+    """
+    An immutable copy of a Game position, see Game.snapshot and Game.restore.
+
+    A snapshot taken relative to a parent only stores the squares that differ
+    from the parent and shares every other square with it, so a tree of
+    snapshots costs memory in proportion to what each move changed. Every
+    KEYFRAME_INTERVAL generations a snapshot stores the full board instead,
+    which bounds the work needed to read one back.
+
+    Attributes:
+        parent: The snapshot the changes are relative to, None for keyframes.
+        board: The full packed board for keyframes, else None.
+        changes: The changed squares as (index, cell) byte pairs, else None.
+        generation: The number of snapshots since the last keyframe.
+        state: Whether the game is in SWAP or ACTION.
+        turn: Whose turn it is to play.
+        passes: The number of passes of black and white.
+        won: The team Colour which has won.
+        hash: The Zobrist hash of the position.
+    """
+
+    KEYFRAME_INTERVAL = 8
+
+    __slots__ = ('parent', 'board', 'changes', 'generation', 'state', 'turn',
+            'passes', 'won', 'hash')
+
+    def __init__(
+            self,
+            parent: Optional['Snapshot'],
+            board: Optional[bytes],
+            changes: Optional[bytes],
+            state,
+            turn: Colour,
+            passes: Tuple[int, int],
+            won: Optional[Colour],
+            hash: int
+            ):
+        self.parent = parent
+        self.board = board
+        self.changes = changes
+        self.generation = 0 if parent is None else parent.generation + 1
+        self.state = state
+        self.turn = turn
+        self.passes = passes
+        self.won = won
+        self.hash = hash
+
+    def cells(self) -> bytes:
+        """
+        Rebuilds the full packed board of the snapshot.
+
+        Returns:
+            The packed cells, one per square.
+        """
+        chain = []
+        snapshot = self
+
+        while snapshot.board is None:
+            chain.append(snapshot.changes)
+            snapshot = snapshot.parent
+
+        board = bytearray(snapshot.board)
+
+        for changes in reversed(chain):
+            for k in range(0, len(changes), 2):
+                board[changes[k]] = changes[k+1]
+
+        return bytes(board)
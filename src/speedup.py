@@ -0,0 +1,79 @@
+"""
+Measures what parallel search (see AlphaBetaBot.searchParallel) gains: the
+time bots with different numbers of workers take to search the starting
+position and positions from random games to a fixed depth. The first
+parallel search of a bot also starts its helper processes, so it is timed
+apart from the others.
+
+Run from src:
+
+    python speedup.py [depth] [samples] [seed]
+"""
+
+import random
+import sys
+from contextlib import redirect_stdout
+from time import perf_counter
+from typing import List, Tuple
+
+from game import Game, GameManager
+from alphabeta import AlphaBetaBot
+
+WORKERS = (1, 2, 4)
+
+
+def samplePositions(rng: random.Random, samples: int, width: int=4, height: int=4,
+                    max_moves: int=40) -> List[Game]:
+    """
+    Returns the starting position and samples - 1 positions from random
+    games that are not over.
+    """
+    positions = [Game(width, height)]
+
+    while len(positions) < samples:
+        game = Game(width, height)
+        for _ in range(rng.randrange(max_moves)):
+            moves = list(game.iterMoves())
+            if game.won is not None or not moves:
+                break
+            game.playMove(rng.choice(moves))
+
+        if game.won is None:
+            positions.append(Game.fromText(game.toText()))
+
+    return positions
+
+def timeSearches(workers: int, positions: List[Game], depth: int) -> Tuple[float, float]:
+    """
+    Searches every position to depth with one bot of workers processes.
+
+    Returns:
+        The seconds the first search took and those the others took.
+    """
+    times = []
+
+    with AlphaBetaBot(GameManager(positions[0].WIDTH, positions[0].HEIGHT), positions[0].turn,
+                      workers=workers) as bot:
+        for game in positions:
+            start = perf_counter()
+            # the search reports its progress, which is not wanted here
+            with redirect_stdout(None):
+                if workers > 1:
+                    bot.searchParallel(game, None, depth)
+                else:
+                    bot.search(game, None, depth)
+            times.append(perf_counter() - start)
+
+    return times[0], sum(times[1:])
+
+
+if __name__ == '__main__':
+    defaults = [5, 10, 0]
+    depth, samples, seed = [int(a) for a in sys.argv[1:4]] + defaults[len(sys.argv) - 1:]
+
+    positions = samplePositions(random.Random(seed), samples)
+
+    for workers in WORKERS:
+        first, rest = timeSearches(workers, positions, depth)
+        print(f'{workers} workers: {first:.2f}s for the first search to depth {depth}, '
+              f'{rest:.2f}s for the other {len(positions) - 1}')
@@ -0,0 +1,136 @@
+"""
+Symmetries of Feud positions. The rules do not change when the board is
+mirrored left to right, or when the colours are swapped and the board is
+flipped top to bottom, so a position and its images under these transforms
+have the same value and mirrored best moves. Caches keyed on the canonical
+form share one entry between all of them.
+
+A transform is a bit set of MIRROR and FLIP, where FLIP also swaps the
+colours, the side to play, the passes and the winner. Every transform is its
+own inverse and two transforms compose by xor.
+"""
+
+from typing import Tuple
+
+from cell import COLOUR_BIT, HP_MASK
+from move import Move, MOVE_SWAP, swapMove
+from zobrist import zobristKeys
+
+Transform = int
+
+IDENTITY: Transform = 0
+MIRROR: Transform = 1
+FLIP: Transform = 2
+TRANSFORMS: Tuple[Transform, ...] = (IDENTITY, MIRROR, FLIP, MIRROR | FLIP)
+
+# swaps the colour of living pieces, dead pieces have no colour
+_SWAP_COLOURS = bytes(c ^ COLOUR_BIT if c & HP_MASK else c for c in range(256))
+
+# swaps the black and white winners in the flags byte of Game.toBytes
+_SWAP_FLAGS = bytes((f ^ 1) & ~0x0c | (0, 2, 1, 3)[f >> 2 & 3] << 2 if f < 16 else f
+        for f in range(256))
+
+
+def squareMap(game, t: Transform) -> Tuple[int, ...]:
+    """
+    Returns the squares of the board under a transform.
+
+    Args:
+        game: A game with the board dimensions to use.
+        t: The transform.
+
+    Returns:
+        A tuple whose i-th element is the square i maps to.
+    """
+    geometry = game.geometry
+    squares = tuple(range(geometry.size))
+
+    if t & MIRROR:
+        squares = tuple(geometry.mirrors[i] for i in squares)
+    if t & FLIP:
+        squares = tuple(geometry.flips[i] for i in squares)
+
+    return squares
+
+def transformMove(game, move: Move, t: Transform) -> Move:
+    """
+    Maps a move to the matching move in the transformed position. As every
+    transform is its own inverse, this also maps a move found in the
+    canonical position back to the game's.
+
+    Args:
+        game: A game with the board dimensions to use.
+        move: The move to map.
+        t: The transform.
+
+    Returns:
+        The mapped move, action targets stay in the same order.
+    """
+    if t == IDENTITY or len(move) == 1:
+        return move
+
+    squares = squareMap(game, t)
+
+    if move[0] == MOVE_SWAP:
+        return swapMove(squares[move[1]], squares[move[2]])
+
+    return (move[0], *(squares[i] for i in move[1:]))
+
+def transformBytes(game, t: Transform) -> bytes:
+    """
+    Encodes the image of the game's position under a transform.
+
+    Args:
+        game: The game to transform.
+        t: The transform.
+
+    Returns:
+        The transformed position in the format of Game.toBytes.
+    """
+    data = game.toBytes()
+
+    if t == IDENTITY:
+        return data
+
+    header, cells = data[:4], data[4:]
+    # the transforms are involutions, so square i takes the cell of squares[i]
+    squares = squareMap(game, t)
+    cells = bytes(cells[j] for j in squares)
+
+    if t & FLIP:
+        cells = cells.translate(_SWAP_COLOURS)
+        header = bytes((header[0], _SWAP_FLAGS[header[1]], header[3], header[2]))
+
+    return header + cells
+
+def canonical(game) -> Tuple[bytes, Transform]:
+    """
+    Finds the representative of the position's symmetry class, the smallest
+    encoding among its images.
+
+    Args:
+        game: The game to canonicalise.
+
+    Returns:
+        The canonical position in the format of Game.toBytes and the
+        transform that maps the game's position onto it.
+    """
+    return min((transformBytes(game, t), t) for t in TRANSFORMS)
+
+def canonicalHash(game) -> Tuple[int, Transform]:
+    """
+    Like canonical, but returns the Zobrist hash of the canonical position,
+    which every position of the symmetry class shares.
+
+    Args:
+        game: The game to canonicalise.
+
+    Returns:
+        The hash of the canonical position and the transform that maps the
+        game's position onto it.
+    """
+    data, t = canonical(game)
+    flags = data[1]
+    keys = zobristKeys(game.geometry.size)
+
+    return keys.positionHash(data[4:], bool(flags & 1), bool(flags & 2), (data[2], data[3])), t
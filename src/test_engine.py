@@ -0,0 +1,189 @@
+"""
+Regression checks of the engine: that the fast paths agree with the slow
+ones they replaced. Run from src:
+
+    python -m pytest test_engine.py
+"""
+
+import pickle
+import random
+
+import pytest
+
+from game import Game, GameManager, State
+from alphabeta import AlphaBetaBot
+from exceptions import BoardError
+from cell import KING, KIND_MASK, ACTIVE_BIT, TEAM
+from move import MOVE_ACTION
+from symmetry import TRANSFORMS, canonicalHash, transformBytes, transformMove
+
+
+def randomGames(seed, games=20, max_moves=60, **settings):
+    """
+    Plays random games, yielding the game after every move.
+    """
+    rng = random.Random(seed)
+
+    for _ in range(games):
+        game = Game(**settings)
+        for _ in range(max_moves):
+            moves = list(game.iterMoves())
+            if game.won is not None or not moves:
+                break
+            game.playMove(rng.choice(moves))
+            yield game
+
+def state(game):
+    """
+    Returns everything a move can change.
+    """
+    return (bytes(game.cells), game.hash, game.state, game.turn, dict(game.passes), game.won,
+            tuple(game.rosters), tuple(game.active_counts), tuple(game.king_masks),
+            dict(game.position_counts), len(game.history))
+
+def counts(game):
+    """
+    Returns the rosters, active counts and king masks worked out from the cells.
+    """
+    rosters, active, kings = [0, 0], [0, 0], [0, 0]
+
+    for i, cell in enumerate(game.cells):
+        if team := TEAM[cell]:
+            rosters[team - 1] |= 1 << i
+            active[team - 1] += bool(cell & ACTIVE_BIT)
+            if cell & KIND_MASK == KING:
+                kings[team - 1] |= 1 << i
+
+    return rosters, active, kings
+
+def normalised(move):
+    if move[0] == MOVE_ACTION:
+        return (MOVE_ACTION, move[1], *sorted(move[2:]))
+    return move
+
+
+@pytest.mark.parametrize('size', [4, 6])
+def test_incremental_hash(size):
+    for game in randomGames(1, width=size, height=size):
+        assert game.hash == game.computeHash()
+
+def test_counts_follow_the_cells():
+    for game in randomGames(5):
+        assert (game.rosters, game.active_counts, game.king_masks) == counts(game)
+
+def test_undo_is_exact():
+    for game in randomGames(2, games=10):
+        before = state(game)
+        moves = []
+        # the moves are generated lazily while each is played and undone
+        for move in game.iterMoves():
+            game.playMove(move)
+            game.undo()
+            assert state(game) == before
+            moves.append(move)
+
+        listed = game.listSwaps() if game.state == State.SWAP else game.listActions()
+        assert sorted(moves) == sorted(listed)
+
+def test_encodings_round_trip():
+    for game in randomGames(3, max_repetitions=3):
+        text, data = game.toText(), game.toBytes()
+        assert Game.fromText(text).toBytes() == data
+        assert Game.fromBytes(data).toText() == text
+
+        copy = pickle.loads(pickle.dumps(game))
+        assert state(copy) == state(game)
+        assert copy.layout == game.layout and copy.max_repetitions == 3
+
+def test_decoding_rejects_bad_positions():
+    start = Game().toText()
+
+    with pytest.raises(BoardError):
+        Game.fromText('A9' + start[2:])
+    with pytest.raises(BoardError):
+        Game.fromText(start.replace('0-0', '99-0'))
+    with pytest.raises(BoardError):
+        Game.fromBytes(Game().toBytes()[:4] + bytes((7,)) + bytes(15))
+
+def test_decoded_games_reset_to_their_layout():
+    game = Game.fromBytes(Game().toBytes())
+    game.resetBoard()
+    assert game.toText() == Game().toText()
+
+def test_symmetry_invariance():
+    for game in randomGames(4, games=10):
+        key = canonicalHash(game)[0]
+        moves = {normalised(m) for m in game.iterMoves()}
+
+        for t in TRANSFORMS:
+            image = Game.fromBytes(transformBytes(game, t))
+            assert canonicalHash(image)[0] == key
+            assert {normalised(transformMove(game, m, t)) for m in moves} \
+                    == {normalised(m) for m in image.iterMoves()}
+
+@pytest.mark.parametrize('max_repetitions', [None, 2])
+def test_batch_matches_game(max_repetitions):
+    np = pytest.importorskip('numpy')
+    from batch import BatchGame
+
+    rng = np.random.default_rng(5)
+    games = [Game(max_repetitions=max_repetitions) for _ in range(32)]
+    batch = BatchGame.fromGames(games)
+
+    for _ in range(80):
+        indices = batch.randomIndices(rng)
+        batch.step(indices)
+        for game, index in zip(games, indices.tolist()):
+            if game.won is None and index >= 0:
+                game.playIndex(index)
+
+        assert [batch.toBytes(k) for k in range(len(games))] == [g.toBytes() for g in games]
+
+def minimax(bot, game, depth, player, ply=0):
+    """
+    The value alphaBeta must find, searching every distinct move.
+    """
+    moves = list(game.iterMoves(unique=True))
+    if depth == 0 or game.won is not None or not moves:
+        return bot.stateHeuristic(game, player, ply)
+
+    values = []
+    for move in moves:
+        game.playMove(move)
+        values.append(minimax(bot, game, depth - 1, player, ply + 1))
+        game.undo()
+
+    return max(values) if game.turn == player else min(values)
+
+@pytest.mark.parametrize('settings', [dict(pvs=False, tt_size=0), dict(), dict(symmetry=True),
+                                      dict(futility=True)])
+def test_alpha_beta_matches_minimax(settings):
+    rng = random.Random(6)
+    positions = [Game.fromText(g.toText()) for g in randomGames(6, games=4, max_moves=30)]
+
+    for game in rng.sample(positions, 6):
+        bot = AlphaBetaBot(None, game.turn, **settings)
+        value = minimax(bot, game, 3, game.turn)
+        # the second search starts from the table of the first
+        for _ in range(2):
+            bot.search(game, None, 3)
+            assert bot.root_scores[0][1] == value
+
+def test_selective_search_sees_a_forced_king_capture():
+    # after any move of black, white swaps quietly and kills the king
+    game = Game.fromText('N3M3w3A2/n3s4W3n3/A3K1S3N2/a1k4m3a2 b s 0-1 -')
+    bot = AlphaBetaBot(None, game.turn, lmr=True, futility=True)
+    bot.search(game, None, 4)
+    assert bot.root_scores[0][1] == 4 - bot.WIN
+
+def test_parallel_bots_start_their_helpers_when_first_needed():
+    manager = GameManager()
+    with AlphaBetaBot(manager, manager.game.turn, workers=2) as bot:
+        assert bot.pool is None
+        bot.searchParallel(Game(), None, 2)
+        assert bot.pool is not None and bot.depth == 2
+    assert bot.pool is None and bot.table is None
+
+def test_empty_squares_have_views():
+    game = Game.fromText('A3K4M3A3/..../..../a3k4m3a3 b s 0-0 -')
+    assert str(game.pieceAt((0, 1))) == '* * * *'
@@ -0,0 +1,272 @@
+"""
+A fixed size transposition table for game tree search. Feud positions
+transpose constantly, swaps can be undone and many actions commute, so the
+search remembers what it found for each position by its hash.
+
+SharedTranspositionTable keeps the same entries in shared memory, so the
+processes of a parallel search can all read and write one table.
+"""
+
+import struct
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, List, NamedTuple, Optional
+
+from actionspace import actionSpace
+
+# how an entry's value relates to the true value of the position
+EXACT = 0
+LOWER = 1   # the true value is at least the entry's value
+UPPER = 2   # the true value is at most the entry's value
+
+
+class Entry(NamedTuple):
+    key: int
+    depth: int
+    value: float
+    bound: int
+    move: Any
+    age: int
+
+
+class TranspositionTable:
+    """
+    Search results by position hash. Every bucket has two entries: one that
+    keeps the deepest result of the current search and one that is always
+    replaced, so deep results survive while recent ones are still found.
+
+    Attributes:
+        size: The number of buckets.
+        age: The number of the current search, see newSearch.
+        probes: The number of lookups.
+        hits: The number of lookups that found their position.
+    """
+
+    def __init__(self, size: int=1 << 16):
+        if size < 1:
+            raise ValueError('A transposition table needs at least one bucket')
+
+        self.size: int = size
+        self.age: int = 0
+        self.probes: int = 0
+        self.hits: int = 0
+        self._deep: List[Optional[Entry]] = [None] * size
+        self._recent: List[Optional[Entry]] = [None] * size
+
+    def newSearch(self) -> None:
+        """
+        Marks the entries of earlier searches as replaceable.
+        """
+        self.age += 1
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """
+        Looks up a position, preferring the deeper entry.
+
+        Args:
+            key: The hash of the position.
+
+        Returns:
+            The entry of the position, or None if there is none.
+        """
+        i = key % self.size
+        self.probes += 1
+
+        for entry in (self._deep[i], self._recent[i]):
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return entry
+
+        return None
+
+    def store(self, key: int, depth: int, value: float, bound: int, move: Any) -> None:
+        """
+        Records the result of searching a position.
+
+        Args:
+            key: The hash of the position.
+            depth: The depth the position was searched to.
+            value: The value found.
+            bound: EXACT, LOWER or UPPER, see above.
+            move: The best move found, or None.
+
+        Returns:
+            None
+        """
+        i = key % self.size
+        entry = Entry(key, depth, value, bound, move, self.age)
+        deep = self._deep[i]
+
+        if deep is None or deep.age != self.age or depth >= deep.depth:
+            self._deep[i] = entry
+        else:
+            self._recent[i] = entry
+
+    def clear(self) -> None:
+        """
+        Forgets every entry and resets the counters.
+        """
+        self._deep = [None] * self.size
+        self._recent = [None] * self.size
+        self.probes = 0
+        self.hits = 0
+
+
+# a slot of SharedTranspositionTable: the key xor the other two words, the
+# packed depth, bound, age and move, and the bits of the value
+_SLOT = struct.Struct('<QQQ')
+_DOUBLE = struct.Struct('<d')
+_BITS = struct.Struct('<Q')
+# the header holds the stop flag and the age of the current search
+_HEADER = 8
+_STOP = 0
+_AGE = 1
+
+_MASK64 = (1 << 64) - 1
+_MOVE_BITS = 20
+_MOVE_MASK = (1 << _MOVE_BITS) - 1
+_TURN_BIT = 1 << 18
+
+
+class SharedTranspositionTable:
+    """
+    A TranspositionTable in shared memory, with the same buckets of two
+    entries. There are no locks: each slot stores its key xor the rest of
+    the slot, so a slot torn by two processes writing at once reads as
+    empty. Moves, and turns of up to two moves, are stored by their index in
+    the action space of the board.
+
+    The table also holds a stop flag that tells every process searching with
+    it to give up, see stop.
+
+    Attributes:
+        size: The number of buckets.
+        name: The name of the shared memory, to attach from other processes.
+        probes: The number of lookups made by this process.
+        hits: The number of those lookups that found their position.
+    """
+
+    def __init__(self, width: int, height: int, size: int=1 << 16, name: Optional[str]=None):
+        if size < 1:
+            raise ValueError('A transposition table needs at least one bucket')
+
+        self.size: int = size
+        self.probes: int = 0
+        self.hits: int = 0
+        self._space = actionSpace(width, height)
+        self._owner = name is None
+
+        if self._owner:
+            self._memory = SharedMemory(create=True, size=_HEADER + 2 * size * _SLOT.size)
+            self._memory.buf[:] = bytes(len(self._memory.buf))
+        else:
+            self._memory = SharedMemory(name=name)
+
+        self.name: str = self._memory.name
+
+    @property
+    def age(self) -> int:
+        return self._memory.buf[_AGE]
+
+    def newSearch(self) -> None:
+        """
+        Marks the entries of earlier searches as replaceable and clears the
+        stop flag.
+        """
+        buf = self._memory.buf
+        buf[_AGE] = (buf[_AGE] + 1) % 256
+        buf[_STOP] = 0
+
+    def stop(self) -> None:
+        """
+        Asks every process searching with the table to stop.
+        """
+        self._memory.buf[_STOP] = 1
+
+    def stopped(self) -> bool:
+        return bool(self._memory.buf[_STOP])
+
+    def _encodeMove(self, move: Any) -> int:
+        if move is None:
+            return 0
+        if isinstance(move[0], tuple):
+            code = _TURN_BIT
+            for k, m in enumerate(move):
+                code |= (self._space.index(m) + 1) << (19 + k * _MOVE_BITS)
+            return code
+        return (self._space.index(move) + 1) << 19
+
+    def _decodeMove(self, data: int) -> Any:
+        moves = []
+        for k in range(2):
+            index = (data >> (19 + k * _MOVE_BITS)) & _MOVE_MASK
+            if index:
+                moves.append(self._space.moves[index - 1])
+
+        if data & _TURN_BIT:
+            return tuple(moves)
+        return moves[0] if moves else None
+
+    def _read(self, offset: int) -> Optional[Entry]:
+        check, data, bits = _SLOT.unpack_from(self._memory.buf, offset)
+        if not data:
+            return None
+
+        key = check ^ data ^ bits
+        value = _DOUBLE.unpack(_BITS.pack(bits))[0]
+
+        return Entry(key, data & 0xff, value, (data >> 8) & 3, self._decodeMove(data), (data >> 10) & 0xff)
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """
+        Looks up a position, preferring the deeper entry, see
+        TranspositionTable.probe.
+        """
+        key &= _MASK64
+        offset = _HEADER + (key % self.size) * 2 * _SLOT.size
+        self.probes += 1
+
+        for slot in (offset, offset + _SLOT.size):
+            entry = self._read(slot)
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return entry
+
+        return None
+
+    def store(self, key: int, depth: int, value: float, bound: int, move: Any) -> None:
+        """
+        Records the result of searching a position, see
+        TranspositionTable.store.
+        """
+        key &= _MASK64
+        offset = _HEADER + (key % self.size) * 2 * _SLOT.size
+        age = self.age
+
+        # depth 0 entries still have a non-zero data word, so empty slots
+        # are the only ones that read as 0
+        data = 1 << 63 | self._encodeMove(move) | age << 10 | bound << 8 | min(depth, 255)
+        bits = _BITS.unpack(_DOUBLE.pack(value))[0]
+
+        deep = self._read(offset)
+        if deep is not None and deep.age == age and depth < deep.depth:
+            offset += _SLOT.size
+
+        _SLOT.pack_into(self._memory.buf, offset, key ^ data ^ bits, data, bits)
+
+    def clear(self) -> None:
+        """
+        Forgets every entry and resets the counters of this process.
+        """
+        buf = self._memory.buf
+        buf[_HEADER:] = bytes(len(buf) - _HEADER)
+        self.probes = 0
+        self.hits = 0
+
+    def close(self) -> None:
+        """
+        Detaches this process from the table, freeing the shared memory if
+        this process created it.
+        """
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
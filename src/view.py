@@ -88,6 +88,7 @@ class View:
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    self.bot.close()
                     if self.standalone:
                         pygame.quit()
                     return
@@ -103,7 +104,7 @@ class View:
                         self.handleAction(pos_game_space)
 
                     for p in self.selection:
-                        self.drawTile(p, str(self.game.pieces()[p]), (0, 255, 0))
+                        self.drawTile(p, str(self.game.pieceAt(p)), (0, 255, 0))
 
                 elif event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
                     if (self.game.state() == State.SWAP and len(self.selection) == 2) or (self.game.state() == State.ACTION):
@@ -117,22 +118,27 @@ class View:
             pygame.display.update()
 
     def possibleSwaps(self):
+        swaps = [self.game.movePoints(swap) for swap in self.game.listSwaps()]
+
         if not (n := len(self.selection)):
-            possible_swaps = {p._pos for swap in self.game.listSwaps() for p in swap}
+            possible_swaps = {p for swap in swaps for p in swap}
         elif n == 1:
-            piece = self.game.pieces()[self.selection[0]] 
-            possible_swaps = {p._pos for swap in self.game.listSwaps() for p in swap if piece in swap}
+            pos = self.selection[0]
+            possible_swaps = {p for swap in swaps for p in swap if pos in swap}
         else:
             possible_swaps = set()
 
         return possible_swaps
 
     def possibleActions(self):
+        # the first point of an action is the acting piece, the skip action has none
+        actions = [self.game.movePoints(action) for action in self.game.listActions()]
+
         if not (n := len(self.selection)):
-            possible_actions = {p._pos for action in self.game.listActions() for p in action}
-        elif 1 <= n <= self.game.pieces()[self.selection[0]]._max_trgts:
-            piece = self.game.pieces()[self.selection[0]]
-            possible_actions = {p._pos for action in piece.listActions(self.game.pieces()) for targets in action.values() for p in targets}
+            possible_actions = {action[0] for action in actions if action}
+        elif 1 <= n <= self.game.pieceAt(self.selection[0])._max_trgts:
+            pos = self.selection[0]
+            possible_actions = {p for action in actions if action[:1] == [pos] for p in action[1:]}
         else:
             possible_actions = set()
 
@@ -145,7 +151,7 @@ class View:
             self.selection.remove(pos)
 
         for p in self.possibleSwaps():
-            self.drawTile(p, str(self.game.pieces()[p]), (255, 165, 0))
+            self.drawTile(p, str(self.game.pieceAt(p)), (255, 165, 0))
 
     def handleAction(self, pos):
         if pos not in self.selection and pos in self.possibleActions():
@@ -158,7 +164,7 @@ class View:
                 self.selection.clear()
 
         for p in self.possibleActions():
-            self.drawTile(p, str(self.game.pieces()[p]), (255, 165, 0))
+            self.drawTile(p, str(self.game.pieceAt(p)), (255, 165, 0))
 
     def drawWinner(self, winner_str):
         if winner_str == 'None':
@@ -199,7 +205,7 @@ class View:
         for col in range(cols):
             for row in range(rows):
                 pos = (col, row)
-                self.drawTile(pos, str(self.game.pieces()[pos]))
+                self.drawTile(pos, str(self.game.pieceAt(pos)))
 
     def drawTile(self, position, tile_data, border_color=None):
         x, y = position
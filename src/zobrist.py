@@ -0,0 +1,74 @@
+"""
+Zobrist keys used to hash Feud positions. The keys are drawn from a fixed
+seed so that every process, client and server computes the same hash for
+the same position.
+"""
+
+from functools import lru_cache
+from random import Random
+from typing import List, Tuple
+
+SEED = 0xFE0D
+MAX_PASSES = 16
+
+
+class ZobristKeys:
+    """
+    The random keys for one board size.
+
+    Attributes:
+        cells: cells[i][cell] is the key of the packed cell on square i.
+        turn: Toggled while it is white's turn.
+        action: Toggled while the game is in the ACTION state.
+        passes: passes[colour][n] is the key of colour having passed n times.
+    """
+
+    def __init__(self, size: int):
+        rng = Random(SEED + size)
+
+        def key() -> int:
+            return rng.getrandbits(64)
+
+        # an empty square hashes to nothing
+        self.cells: List[Tuple[int, ...]] = [
+                (0,) + tuple(key() for _ in range(255)) for _ in range(size)]
+        self.turn: int = key()
+        self.action: int = key()
+        self.passes: List[Tuple[int, ...]] = [
+                (0,) + tuple(key() for _ in range(MAX_PASSES - 1)) for _ in range(2)]
+
+    def passKey(self, colour_value: int, passes: int) -> int:
+        return self.passes[colour_value][min(passes, MAX_PASSES - 1)]
+
+    def positionHash(self, cells: bytes, white: bool, action: bool, passes: Tuple[int, int]) -> int:
+        """
+        Computes the hash of a position from scratch.
+
+        Args:
+            cells: The packed cell of each square.
+            white: Whether it is white's turn.
+            action: Whether the game is in the ACTION state.
+            passes: The number of passes of black and white.
+
+        Returns:
+            The 64 bit hash of the position.
+        """
+        h = 0
+
+        for i, cell in enumerate(cells):
+            h ^= self.cells[i][cell]
+
+        if white:
+            h ^= self.turn
+        if action:
+            h ^= self.action
+
+        return h ^ self.passKey(0, passes[0]) ^ self.passKey(1, passes[1])
+
+
+@lru_cache(maxsize=None)
+def zobristKeys(size: int) -> ZobristKeys:
+    """
+    Returns the shared keys for a board of size squares.
+    """
+    return ZobristKeys(size)